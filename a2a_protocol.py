@@ -1,11 +1,38 @@
 """A2A (Agent-to-Agent) Protocol Implementation for agent collaboration."""
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from dataclasses import dataclass
+from collections import defaultdict
 import asyncio
+import itertools
 import json
+import logging
+import os
+import time
 import uuid
 
+logger = logging.getLogger("a2a_protocol")
+
+
+# Message IDs are a random per-process prefix followed by a counter, which
+# avoids an os.urandom() call and UUID formatting for every message
+_message_id_prefix = uuid.uuid4().hex[:16]
+_message_counter = itertools.count()
+
+# Bound once so default timestamps skip the module attribute lookup
+_time = time.time
+
+
+def _reset_message_ids() -> None:
+    """Pick a new message ID prefix so forked processes don't reuse the parent's IDs."""
+    global _message_id_prefix, _message_counter
+    _message_id_prefix = uuid.uuid4().hex[:16]
+    _message_counter = itertools.count()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_message_ids)
+
 
 @dataclass
 class AgentInfo:
@@ -16,40 +43,141 @@ class AgentInfo:
     metadata: Dict[str, Any] = None
 
 
-@dataclass
 class Message:
-    """A message in the A2A protocol system."""
-    sender_id: str
-    recipient_id: str
-    content: str
-    type: str = "request"  # request, response, broadcast, etc.
-    message_id: str = None
-    thread_id: str = None
-    timestamp: float = None
-    
-    def __post_init__(self):
-        """Initialize default values for message_id and thread_id if not provided."""
+    """A message in the A2A protocol system.
+    
+    Uses ``__slots__`` instead of a per-instance ``__dict__`` and memoizes
+    ``to_dict()``, so the history and every inbox share one dictionary.
+    """
+    
+    __slots__ = (
+        "sender_id", "recipient_id", "content", "type",
+        "message_id", "thread_id", "timestamp", "_cached_dict"
+    )
+    
+    def __init__(
+        self,
+        sender_id: str,
+        recipient_id: str,
+        content: str,
+        type: str = "request",  # request, response, broadcast, etc.
+        message_id: str = None,
+        thread_id: str = None,
+        timestamp: float = None
+    ):
+        """Initialize the message, generating message_id, thread_id and timestamp if not provided."""
+        self.sender_id = sender_id
+        self.recipient_id = recipient_id
+        self.content = content
+        self.type = type
+        self.message_id = message_id
+        self.thread_id = thread_id
+        self.timestamp = timestamp
+        self._cached_dict: Optional[Dict[str, Any]] = None
+        
         if self.message_id is None:
-            self.message_id = str(uuid.uuid4())
+            self.message_id = f"{_message_id_prefix}{next(_message_counter):016x}"
         
         if self.thread_id is None:
             self.thread_id = self.message_id
         
         if self.timestamp is None:
-            import time
-            self.timestamp = time.time()
+            self.timestamp = _time()
+    
+    def __repr__(self) -> str:
+        return (
+            f"Message(sender_id={self.sender_id!r}, recipient_id={self.recipient_id!r}, "
+            f"type={self.type!r}, message_id={self.message_id!r}, thread_id={self.thread_id!r})"
+        )
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert the message to a dictionary."""
-        return {
-            "message_id": self.message_id,
-            "thread_id": self.thread_id,
-            "sender_id": self.sender_id,
-            "recipient_id": self.recipient_id,
-            "content": self.content,
-            "type": self.type,
-            "timestamp": self.timestamp
-        }
+        """Convert the message to a dictionary.
+        
+        The dictionary is built on first use and the same object is returned
+        afterwards, so callers must treat it as read-only.
+        """
+        if self._cached_dict is None:
+            self._cached_dict = {
+                "message_id": self.message_id,
+                "thread_id": self.thread_id,
+                "sender_id": self.sender_id,
+                "recipient_id": self.recipient_id,
+                "content": self.content,
+                "type": self.type,
+                "timestamp": self.timestamp
+            }
+        return self._cached_dict
+
+
+class RingBuffer:
+    """
+    Fixed-capacity ring buffer used as a single-consumer agent inbox.
+    
+    The capacity must be a power of two so a sequence number maps to its
+    slot with ``seq & mask`` instead of a modulo. ``head`` is the next
+    sequence to write and ``tail`` the next sequence to read.
+    """
+    
+    __slots__ = ("buf", "mask", "head", "tail")
+    
+    def __init__(self, capacity: int = 1024):
+        """Initialize an empty ring buffer with the given power-of-two capacity."""
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError(f"Ring buffer capacity must be a power of two, got {capacity}")
+        
+        self.buf: List[Any] = [None] * capacity
+        self.mask = capacity - 1
+        self.head = 0
+        self.tail = 0
+    
+    def __len__(self) -> int:
+        return self.head - self.tail
+    
+    def push(self, item: Any) -> bool:
+        """Append an item, returning False if the buffer is full."""
+        if self.head - self.tail > self.mask:
+            return False
+        
+        self.buf[self.head & self.mask] = item
+        self.head += 1
+        return True
+    
+    def drain(self, max_items: Optional[int] = None) -> List[Any]:
+        """Remove and return pending items in arrival order.
+        
+        Items are copied out with at most two slice operations rather than
+        one Python-level step per message.
+        
+        Args:
+            max_items: Optional upper bound on the number of items to remove
+            
+        Returns:
+            List of removed items
+        """
+        count = self.head - self.tail
+        if max_items is not None and max_items < count:
+            count = max_items
+        
+        if count <= 0:
+            return []
+        
+        buf = self.buf
+        capacity = len(buf)
+        start = self.tail & self.mask
+        end = start + count
+        
+        if end <= capacity:
+            items = buf[start:end]
+            buf[start:end] = [None] * count
+        else:
+            # The pending range wraps around the end of the buffer
+            end -= capacity
+            items = buf[start:] + buf[:end]
+            buf[start:] = [None] * (capacity - start)
+            buf[:end] = [None] * end
+        
+        self.tail += count
+        return items
 
 
 class A2AProtocol:
@@ -62,11 +190,23 @@ class A2AProtocol:
     3. Collaboration patterns
     """
     
-    def __init__(self):
-        """Initialize the A2A protocol handler."""
+    def __init__(self, inbox_capacity: int = 1024):
+        """Initialize the A2A protocol handler.
+        
+        Args:
+            inbox_capacity: Maximum pending messages per agent (must be a power of two)
+        """
+        if inbox_capacity <= 0 or inbox_capacity & (inbox_capacity - 1):
+            raise ValueError(f"inbox_capacity must be a power of two, got {inbox_capacity}")
+        
+        self.inbox_capacity = inbox_capacity
         self.agents = {}  # Dictionary of registered agents
-        self.message_queue = asyncio.Queue()  # Queue for messages
-        self.message_history = {}  # History of messages by thread_id
+        self.inboxes: Dict[str, RingBuffer] = {}  # Pending messages by recipient agent_id
+        self.inbox_events: Dict[str, asyncio.Event] = {}  # Set when an inbox receives messages
+        self.message_log: List[Dict[str, Any]] = []  # Every message sent, in order
+        self.thread_index: Dict[str, List[int]] = defaultdict(list)  # Positions in message_log by thread_id
+        self.capability_index: Dict[str, Set[str]] = defaultdict(set)  # Agent IDs by capability
+        self._dropped: Dict[str, int] = defaultdict(int)  # Broadcasts dropped on full inboxes by agent_id
     
     async def register_agent(self, agent_info: AgentInfo) -> bool:
         """Register an agent with the A2A protocol.
@@ -88,6 +228,11 @@ class A2AProtocol:
             "metadata": agent_info.metadata or {},
             "status": "active"
         }
+        self.inboxes[agent_info.id] = RingBuffer(self.inbox_capacity)
+        self.inbox_events[agent_info.id] = asyncio.Event()
+        
+        for capability in agent_info.capabilities:
+            self.capability_index[capability].add(agent_info.id)
         
         print(f"Agent {agent_info.name} ({agent_info.id}) registered with capabilities: {agent_info.capabilities}")
         return True
@@ -105,7 +250,17 @@ class A2AProtocol:
             print(f"Agent {agent_id} is not registered")
             return False
         
+        for capability in self.agents[agent_id]["capabilities"]:
+            agent_ids = self.capability_index.get(capability)
+            if agent_ids is not None:
+                agent_ids.discard(agent_id)
+                if not agent_ids:
+                    del self.capability_index[capability]
+        
         del self.agents[agent_id]
+        self.inboxes.pop(agent_id, None)
+        self.inbox_events.pop(agent_id, None)
+        self._dropped.pop(agent_id, None)
         print(f"Agent {agent_id} unregistered")
         return True
     
@@ -125,13 +280,25 @@ class A2AProtocol:
         if message.recipient_id != "broadcast" and message.recipient_id not in self.agents:
             return {"status": "error", "error": f"Recipient agent {message.recipient_id} is not registered"}
         
-        # Add message to queue and history
-        await self.message_queue.put(message)
+        # Serialize once and deliver the same dict to every inbox and the history
+        payload = message.to_dict()
         
-        if message.thread_id not in self.message_history:
-            self.message_history[message.thread_id] = []
+        if message.recipient_id == "broadcast":
+            for agent_id, inbox in self.inboxes.items():
+                if agent_id == message.sender_id:
+                    continue
+                if inbox.push(payload):
+                    self.inbox_events[agent_id].set()
+                else:
+                    self._dropped[agent_id] += 1
+                    logger.warning("Inbox of agent %s is full; dropped broadcast %s", agent_id, message.message_id)
+        else:
+            if not self.inboxes[message.recipient_id].push(payload):
+                return {"status": "error", "error": f"Inbox of recipient agent {message.recipient_id} is full"}
+            self.inbox_events[message.recipient_id].set()
         
-        self.message_history[message.thread_id].append(message.to_dict())
+        self.thread_index[message.thread_id].append(len(self.message_log))
+        self.message_log.append(payload)
         
         return {
             "status": "success", 
@@ -142,6 +309,9 @@ class A2AProtocol:
     async def receive_messages(self, agent_id: str, timeout: float = 0.1) -> List[Dict[str, Any]]:
         """Receive messages for a specific agent.
         
+        If the inbox is empty, waits up to ``timeout`` seconds for a message
+        to arrive, then returns everything that is pending.
+        
         Args:
             agent_id: ID of the agent to receive messages for
             timeout: Time to wait for messages
@@ -149,25 +319,42 @@ class A2AProtocol:
         Returns:
             List of messages for the agent
         """
-        messages = []
+        return await self.receive_batches(agent_id, max_batch=None, timeout=timeout)
+    
+    async def receive_batches(
+        self,
+        agent_id: str,
+        max_batch: Optional[int] = 512,
+        timeout: float = 0.01
+    ) -> List[Dict[str, Any]]:
+        """Wait for messages for a specific agent and take them as one batch.
         
+        Args:
+            agent_id: ID of the agent to receive messages for
+            max_batch: Maximum number of messages to return (None for no limit)
+            timeout: Time to wait for a message if the inbox is empty
+            
+        Returns:
+            Up to max_batch messages, or an empty list if none arrived in time
+        """
         # Check if agent is registered
         if agent_id not in self.agents:
             return []
         
-        # Process queue with timeout
-        try:
-            while True:
-                message = self.message_queue.get_nowait()
-                
-                if message.recipient_id == agent_id or message.recipient_id == "broadcast":
-                    messages.append(message.to_dict())
-                
-                self.message_queue.task_done()
-        except asyncio.QueueEmpty:
-            pass
+        inbox = self.inboxes[agent_id]
+        event = self.inbox_events[agent_id]
+        
+        if not inbox:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
         
-        return messages
+        batch = inbox.drain(max_batch)
+        if not inbox:
+            event.clear()
+        
+        return batch
     
     def get_agents_with_capability(self, capability: str) -> List[Dict[str, Any]]:
         """Find agents that have a specific capability.
@@ -178,13 +365,15 @@ class A2AProtocol:
         Returns:
             List of agents with the specified capability
         """
-        matching_agents = []
-        
-        for agent_id, agent_info in self.agents.items():
-            if capability in agent_info["capabilities"]:
-                matching_agents.append(agent_info)
+        return [self.agents[agent_id] for agent_id in self.capability_index.get(capability, ())]
+    
+    def get_dropped_counts(self) -> Dict[str, int]:
+        """Get the number of broadcasts dropped because an agent's inbox was full.
         
-        return matching_agents
+        Returns:
+            Dictionary mapping agent IDs to dropped message counts
+        """
+        return dict(self._dropped)
     
     def get_thread_history(self, thread_id: str) -> List[Dict[str, Any]]:
         """Get the history of messages for a specific thread.
@@ -195,4 +384,18 @@ class A2AProtocol:
         Returns:
             List of messages in the thread
         """
-        return self.message_history.get(thread_id, [])
+        message_log = self.message_log
+        return [message_log[i] for i in self.thread_index.get(thread_id, ())]
+    
+    def get_recent_messages(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the most recent messages across all threads.
+        
+        Args:
+            limit: Maximum number of messages to return
+            
+        Returns:
+            List of messages, oldest first
+        """
+        if limit <= 0:
+            return []
+        return self.message_log[-limit:]
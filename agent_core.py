@@ -1,10 +1,96 @@
 """Simplified agent core with Ollama support."""
 
 import asyncio
+import atexit
 import os
-from typing import Any, Callable, Dict, List, Optional
+import threading
+import weakref
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, Optional
 import ollama
 
+# Ollama AsyncClients are shared by all agents. A client's connection pool is
+# bound to the event loop it first runs on, so clients are cached per loop and host.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, ollama.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_client(host: str) -> ollama.AsyncClient:
+    """Get the shared Ollama AsyncClient for the running event loop.
+    
+    Args:
+        host: Base URL of the Ollama server
+        
+    Returns:
+        An ollama.AsyncClient
+    """
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(host)
+    if client is None:
+        client = clients[host] = ollama.AsyncClient(host=host)
+    return client
+
+
+async def close_async_clients() -> None:
+    """Close the shared Ollama AsyncClients of the running event loop."""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    # Close the underlying httpx clients directly; older ollama releases have no close()
+    await asyncio.gather(*(client._client.aclose() for client in clients.values()), return_exceptions=True)
+
+
+# Long-lived event loop used by Agent.run_sync, started on first use
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_thread: Optional[threading.Thread] = None
+_background_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Get the shared event loop that runs synchronous agent calls.
+    
+    The loop runs forever on a daemon thread, so clients and connection
+    pools bound to it survive between calls.
+    
+    Returns:
+        The running background event loop
+    """
+    global _background_loop, _background_thread
+    with _background_loop_lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="agent-core-loop", daemon=True)
+            thread.start()
+            _background_loop, _background_thread = loop, thread
+            atexit.register(shutdown_background_loop)
+    return _background_loop
+
+
+def shutdown_background_loop(timeout: float = 5.0) -> None:
+    """Close the background loop's Ollama clients, then stop and close the loop.
+    
+    Registered with atexit when the loop starts; safe to call more than once.
+    A later get_background_loop() call starts a fresh loop.
+    
+    Args:
+        timeout: Seconds to wait for the clients to close and the thread to exit
+    """
+    global _background_loop, _background_thread
+    with _background_loop_lock:
+        loop, thread = _background_loop, _background_thread
+        _background_loop = _background_thread = None
+    if loop is None:
+        return
+    
+    atexit.unregister(shutdown_background_loop)
+    try:
+        asyncio.run_coroutine_threadsafe(close_async_clients(), loop).result(timeout)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+
 class Agent:
     """Simplified agent that works with Ollama."""
     
@@ -24,7 +110,23 @@ class Agent:
         self.model = model
         self.system_prompt = system_prompt
         self.tools = tools or []
-        self.client = ollama.Client(host=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"))
+        self._tool_map: Dict[str, Callable] = {tool.__name__: tool for tool in self.tools}
+        self.host = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    
+    @property
+    def system_prompt(self) -> str:
+        """System prompt for the agent."""
+        return self._system_message["content"]
+    
+    @system_prompt.setter
+    def system_prompt(self, system_prompt: str) -> None:
+        # Rebuild the shared system message so later calls pick up the new prompt
+        self._system_message: Mapping[str, str] = MappingProxyType({"role": "system", "content": system_prompt})
+    
+    @property
+    def client(self) -> ollama.AsyncClient:
+        """The shared Ollama AsyncClient for the running event loop."""
+        return get_async_client(self.host)
     
     def tool(self, func: Callable) -> Callable:
         """Decorator to register a tool with the agent.
@@ -36,8 +138,9 @@ class Agent:
             The decorated function
         """
         self.tools.append(func)
+        self._tool_map[func.__name__] = func
         return func
-
+    
         
     async def _generate_response(self, messages: List[Dict[str, str]]) -> str:
         """Generate a response using Ollama.
@@ -48,12 +151,42 @@ class Agent:
         Returns:
             The model's response text
         """
-        response = self.client.chat(
+        response = await self.client.chat(
             model=self.model,
             messages=messages
         )
         return response.message.content
     
+    async def _generate_stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Generate a response using Ollama, yielding text chunks as they arrive.
+        
+        Args:
+            messages: List of message dictionaries with role and content
+            
+        Yields:
+            Chunks of the model's response text
+        """
+        stream = await self.client.chat(
+            model=self.model,
+            messages=messages,
+            stream=True
+        )
+        async for chunk in stream:
+            yield chunk.message.content
+    
+    def _build_messages(self, prompt: str) -> List[Mapping[str, str]]:
+        """Build the chat messages for a prompt.
+        
+        The system message is built once per system prompt and shared by every call.
+        
+        Args:
+            prompt: The user's input prompt
+            
+        Returns:
+            List of message dictionaries with role and content
+        """
+        return [self._system_message, {"role": "user", "content": prompt}]
+    
     async def run(self, prompt: str) -> str:
         """Run the agent on a prompt.
         
@@ -63,14 +196,24 @@ class Agent:
         Returns:
             The agent's response
         """
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response = await self._generate_response(messages)
+        response = await self._generate_response(self._build_messages(prompt))
         return response
     
+    async def run_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Run the agent on a prompt, streaming the response.
+        
+        Downstream work (e.g. forwarding over A2A) can start on the first
+        chunk instead of waiting for the full completion.
+        
+        Args:
+            prompt: The user's input prompt
+            
+        Yields:
+            Chunks of the agent's response
+        """
+        async for chunk in self._generate_stream(self._build_messages(prompt)):
+            yield chunk
+    
     def run_sync(self, prompt: str) -> str:
         """Synchronous version of run.
         
@@ -80,7 +223,7 @@ class Agent:
         Returns:
             The agent's response
         """
-        return asyncio.run(self.run(prompt))
+        return asyncio.run_coroutine_threadsafe(self.run(prompt), get_background_loop()).result()
     
     async def run_tool(self, tool_name: str, **kwargs) -> Any:
         """Run a specific tool.
@@ -92,7 +235,7 @@ class Agent:
         Returns:
             The tool's output
         """
-        for tool in self.tools:
-            if tool.__name__ == tool_name:
-                return await tool(**kwargs)
-        raise ValueError(f"Tool {tool_name} not found")
+        tool = self._tool_map.get(tool_name)
+        if tool is None:
+            raise ValueError(f"Tool {tool_name} not found")
+        return await tool(**kwargs)
@@ -0,0 +1,433 @@
+"""Caches for embeddings and vector search results."""
+
+import os
+import copy
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+# Maximum number of bound parameters per sqlite lookup, below sqlite's limit
+SQLITE_BATCH_SIZE = 500
+
+
+class _VectorIndex:
+    """Unit-normalised float32 embeddings stored as rows of one contiguous matrix.
+    
+    Rows are preallocated with doubling capacity and removed by moving the
+    last row into the freed slot, so adds and removals never copy the matrix.
+    """
+    
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.matrix = np.empty((16, dimensions), dtype=np.float32)
+        self.keys: List[Tuple] = []
+        self.rows: Dict[Tuple, int] = {}
+    
+    def add(self, key: Tuple, vector: np.ndarray) -> None:
+        """Store the vector for a key, replacing any previous one."""
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == self.matrix.shape[0]:
+                grown = np.empty((row * 2, self.dimensions), dtype=np.float32)
+                grown[:row] = self.matrix
+                self.matrix = grown
+            self.keys.append(key)
+            self.rows[key] = row
+        self.matrix[row] = vector
+    
+    def remove(self, key: Tuple) -> None:
+        """Drop the vector for a key if present."""
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        
+        last_key = self.keys.pop()
+        if last_key != key:
+            self.matrix[row] = self.matrix[len(self.keys)]
+            self.keys[row] = last_key
+            self.rows[last_key] = row
+    
+    def best(self, vector: np.ndarray) -> Tuple[Optional[Tuple], float]:
+        """Return the key most similar to a unit vector and its cosine similarity."""
+        if not self.keys:
+            return None, -1.0
+        
+        similarities = self.matrix[:len(self.keys)] @ vector
+        row = int(np.argmax(similarities))
+        return self.keys[row], float(similarities[row])
+
+
+class QueryCache:
+    """Two-tier cache for vector search results.
+    
+    Exact repeats of a query are served from an LRU keyed by the query text.
+    When the caller supplies a query embedding, a query whose cosine
+    similarity to a cached one reaches ``similarity_threshold`` is also
+    served from the cache. Only queries against the same table, result count
+    and filters are compared.
+    
+    Entries expire ``ttl`` seconds after they are stored, so rows written by
+    other processes show up without an explicit invalidation. Results are
+    copied on the way in and out, so callers can't modify cached entries. The
+    cache is safe to share between threads.
+    """
+    
+    def __init__(self, cache_size: int = 1024, similarity_threshold: float = 0.95, ttl: float = 60.0):
+        """Initialize the cache.
+        
+        Args:
+            cache_size: Maximum number of cached queries
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            ttl: Seconds after which a cached entry expires
+        """
+        self.cache_size = cache_size
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        
+        # Exact entries in LRU order: (scope, query_text) -> (expiry time, results)
+        self._entries: OrderedDict = OrderedDict()
+        
+        # Semantic index per scope
+        self._vectors: Dict[Tuple[str, int, bytes], _VectorIndex] = {}
+        
+        # Searches run on worker threads
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _scope(table_name: str, n_results: int, filters: Optional[Dict[str, Any]]) -> Tuple[str, int, bytes]:
+        """Build the hashable scope shared by comparable queries."""
+        filters_key = orjson.dumps(filters, option=orjson.OPT_SORT_KEYS, default=str) if filters else b""
+        return (table_name, n_results, filters_key)
+    
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        """Convert an embedding to a unit-length float32 vector."""
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return None
+        return vector / norm
+    
+    def get(
+        self,
+        table_name: str,
+        query_text: str,
+        n_results: int,
+        filters: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[Sequence[float]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Look up cached results for a query.
+        
+        Args:
+            table_name: Name of the table
+            query_text: Text that was searched for
+            n_results: Number of results requested
+            filters: Filters applied to the query
+            query_embedding: Optional embedding of the query text
+            
+        Returns:
+            A copy of the cached results, or None on a miss
+        """
+        scope = self._scope(table_name, n_results, filters)
+        query_vector = self._normalize(query_embedding) if query_embedding is not None else None
+        
+        with self._lock:
+            key = (scope, query_text)
+            if key not in self._entries:
+                key = self._nearest(scope, query_vector)
+                if key is None:
+                    return None
+            
+            expires_at, results = self._entries[key]
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            
+            self._entries.move_to_end(key)
+        
+        return copy.deepcopy(results)
+    
+    def _nearest(self, scope: Tuple[str, int, bytes], query_vector: Optional[np.ndarray]) -> Optional[Tuple]:
+        """Find the cached key whose embedding is similar enough to a query vector."""
+        index = self._vectors.get(scope)
+        if query_vector is None or index is None or index.dimensions != query_vector.shape[0]:
+            return None
+        
+        key, similarity = index.best(query_vector)
+        if key is None or similarity < self.similarity_threshold:
+            return None
+        return key
+    
+    def put(
+        self,
+        table_name: str,
+        query_text: str,
+        n_results: int,
+        filters: Optional[Dict[str, Any]],
+        results: Dict[str, Any],
+        query_embedding: Optional[Sequence[float]] = None,
+    ) -> None:
+        """Store results for a query, evicting the least recently used entry if full.
+        
+        Args:
+            table_name: Name of the table
+            query_text: Text that was searched for
+            n_results: Number of results requested
+            filters: Filters applied to the query
+            results: Query results to cache
+            query_embedding: Optional embedding of the query text
+        """
+        scope = self._scope(table_name, n_results, filters)
+        key = (scope, query_text)
+        query_vector = self._normalize(query_embedding) if query_embedding is not None else None
+        entry = (time.monotonic() + self.ttl, copy.deepcopy(results))
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            
+            self._entries[key] = entry
+            
+            if query_vector is not None:
+                index = self._vectors.get(scope)
+                if index is None or index.dimensions != query_vector.shape[0]:
+                    index = self._vectors[scope] = _VectorIndex(query_vector.shape[0])
+                index.add(key, query_vector)
+            
+            while len(self._entries) > self.cache_size:
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, key: Tuple) -> None:
+        """Drop one entry from both tiers; the caller holds the lock."""
+        self._entries.pop(key, None)
+        
+        scope = key[0]
+        index = self._vectors.get(scope)
+        if index is not None:
+            index.remove(key)
+            if not index.keys:
+                del self._vectors[scope]
+    
+    def invalidate(self, table_name: Optional[str] = None) -> None:
+        """Drop cached results for one table, or for all tables.
+        
+        Args:
+            table_name: Table whose results should be dropped, or None for all
+        """
+        with self._lock:
+            if table_name is None:
+                self._entries.clear()
+                self._vectors.clear()
+                return
+            
+            for key in [key for key in self._entries if key[0][0] == table_name]:
+                self._remove(key)
+
+
+# Shared cache used by utils.query_supabase_collection
+query_cache = QueryCache()
+
+
+class EmbeddingStore:
+    """Disk-backed embedding cache shared across processes and restarts.
+    
+    Vectors are kept in a memory-mapped float32 file of ``capacity`` rows, and
+    a sqlite table maps the SHA-256 of each text to its row. Processes that
+    open the same directory share one page cache for the vectors.
+    
+    The vector file is preallocated to ``capacity`` rows, so the caller picks
+    where it lives and how large it may grow. A store can be reopened with a
+    larger capacity, but not with one smaller than the rows already in use.
+    """
+    
+    def __init__(self, dimensions: int, path: str, capacity: int = 10000):
+        """Open or create the store.
+        
+        Args:
+            dimensions: Length of the stored embeddings
+            path: Directory holding the vector and index files
+            capacity: Maximum number of stored embeddings
+            
+        Raises:
+            ValueError: If the existing files don't fit the dimensions or capacity
+        """
+        self.dimensions = dimensions
+        self.capacity = capacity
+        os.makedirs(path, exist_ok=True)
+        
+        self._db = sqlite3.connect(
+            os.path.join(path, f"embeddings-{dimensions}.sqlite"),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        try:
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (sha256 BLOB PRIMARY KEY, idx INTEGER NOT NULL)")
+            used_rows = self._db.execute("SELECT COALESCE(MAX(idx) + 1, 0) FROM embeddings").fetchone()[0]
+            
+            # Grow the (sparse) vector file to the requested capacity before mapping it,
+            # but never map fewer rows than the file or the index already use
+            vectors_path = os.path.join(path, f"embeddings-{dimensions}.f32")
+            row_size = dimensions * 4
+            with open(vectors_path, "ab") as f:
+                file_size = f.tell()
+                if file_size % row_size:
+                    raise ValueError(f"{vectors_path} is not a whole number of {dimensions}-dimensional rows")
+                file_rows = file_size // row_size
+                if used_rows > file_rows:
+                    raise ValueError(f"{vectors_path} holds {file_rows} rows but the index refers to {used_rows}")
+                if max(file_rows, used_rows) > capacity:
+                    raise ValueError(
+                        f"Embedding store at {path} already holds {max(file_rows, used_rows)} rows; "
+                        f"capacity {capacity} is too small"
+                    )
+                if file_size < capacity * row_size:
+                    f.truncate(capacity * row_size)
+            self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dimensions))
+        except BaseException:
+            self._db.close()
+            raise
+        
+        # The connection is shared by the worker threads that embed batches
+        self._lock = threading.Lock()
+    
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        """Look up stored embeddings.
+        
+        Args:
+            keys: SHA-256 digests of the texts
+            
+        Returns:
+            The stored embeddings by digest; missing keys are left out
+        """
+        rows = []
+        with self._lock:
+            # Stay below sqlite's limit on bound parameters
+            for start in range(0, len(keys), SQLITE_BATCH_SIZE):
+                batch = keys[start:start + SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows.extend(self._db.execute(
+                    f"SELECT sha256, idx FROM embeddings WHERE sha256 IN ({placeholders})", batch
+                ).fetchall())
+        
+        # Rows beyond this store's capacity were written by a larger store on the same files
+        return {key: self._vectors[idx].tolist() for key, idx in rows if idx < self.capacity}
+    
+    def put_many(self, items: Dict[bytes, List[float]]) -> None:
+        """Store embeddings that are not stored yet, until the store is full.
+        
+        Args:
+            items: Embeddings by SHA-256 digest of their text
+        """
+        with self._lock:
+            # Reserve rows and write the vectors before the index rows become visible
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                next_idx = self._db.execute("SELECT COALESCE(MAX(idx) + 1, 0) FROM embeddings").fetchone()[0]
+                rows = []
+                for key, vector in items.items():
+                    if next_idx >= self.capacity:
+                        break
+                    if self._db.execute("SELECT 1 FROM embeddings WHERE sha256 = ?", (key,)).fetchone():
+                        continue
+                    self._vectors[next_idx] = vector
+                    rows.append((key, next_idx))
+                    next_idx += 1
+                
+                if rows:
+                    self._vectors.flush()
+                    self._db.executemany("INSERT INTO embeddings (sha256, idx) VALUES (?, ?)", rows)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+    
+    def close(self) -> None:
+        """Flush the vectors and close the index."""
+        with self._lock:
+            self._vectors.flush()
+            self._db.close()
+
+
+class CachedEmbedder:
+    """Wrap a batch embedding function with an LRU cache keyed by SHA-256.
+    
+    Texts that were embedded before are served from the cache, then from the
+    optional on-disk store; the rest are sent to the wrapped function in a
+    single call.
+    """
+    
+    def __init__(
+        self,
+        embed: Callable[[List[str]], List[List[float]]],
+        cache_size: int = 10000,
+        store: Optional[EmbeddingStore] = None,
+    ):
+        """Initialize the embedder.
+        
+        Args:
+            embed: Function that embeds a list of texts in one call
+            cache_size: Maximum number of cached embeddings
+            store: Optional on-disk store that persists embeddings across restarts
+        """
+        self.embed = embed
+        self.cache_size = cache_size
+        self.store = store
+        self._cache: OrderedDict = OrderedDict()
+        
+        # Batches may be embedded from several worker threads at once
+        self._lock = threading.Lock()
+    
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            One embedding per text, in input order
+        """
+        keys = [hashlib.sha256(text.encode("utf-8")).digest() for text in texts]
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        missing: Dict[bytes, List[int]] = {}
+        
+        with self._lock:
+            for index, key in enumerate(keys):
+                vector = self._cache.get(key)
+                if vector is None:
+                    missing.setdefault(key, []).append(index)
+                else:
+                    self._cache.move_to_end(key)
+                    vectors[index] = vector
+        
+        if missing and self.store is not None:
+            stored = self.store.get_many(list(missing))
+            for key, vector in stored.items():
+                for index in missing.pop(key):
+                    vectors[index] = vector
+            self._remember(stored)
+        
+        if missing:
+            embedded = dict(zip(missing, self.embed([texts[indexes[0]] for indexes in missing.values()])))
+            for key, indexes in missing.items():
+                for index in indexes:
+                    vectors[index] = embedded[key]
+            self._remember(embedded)
+            
+            if self.store is not None:
+                self.store.put_many(embedded)
+        
+        return vectors
+    
+    def _remember(self, embedded: Dict[bytes, List[float]]) -> None:
+        """Add embeddings to the in-memory LRU, evicting the oldest if full."""
+        with self._lock:
+            self._cache.update(embedded)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
@@ -5,12 +5,17 @@ This script demonstrates how to interact with the SearXNG MCP service.
 """
 
 import requests
-import time
+from requests.adapters import HTTPAdapter
 import argparse
 import json
 
 
-def search_with_searxng_mcp(query, mcp_url="http://localhost:8081", num_results=5, language="all", categories=None):
+# Shared session so tool discovery, execution and result calls reuse connections
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
+def search_with_searxng_mcp(query, mcp_url="http://localhost:8081", num_results=5, language="all", categories=None, wait=5.0):
     """
     Perform a search using the SearXNG MCP.
     
@@ -20,6 +25,7 @@ def search_with_searxng_mcp(query, mcp_url="http://localhost:8081", num_results=
         num_results (int): Number of results to return
         language (str): Language filter
         categories (list): List of search categories
+        wait (float): Seconds the MCP may hold the request while the search runs
         
     Returns:
         dict: Search results or error message
@@ -29,7 +35,7 @@ def search_with_searxng_mcp(query, mcp_url="http://localhost:8081", num_results=
     
     # Step 1: Discover available tools
     try:
-        tools_response = requests.get(f"{mcp_url}/tools")
+        tools_response = session.get(f"{mcp_url}/tools")
         if tools_response.status_code != 200:
             return {
                 "error": f"Failed to discover tools: HTTP {tools_response.status_code}",
@@ -61,7 +67,7 @@ def search_with_searxng_mcp(query, mcp_url="http://localhost:8081", num_results=
         }
         
         execute_url = f"{mcp_url}/tools/{tool_id}/execute"
-        execute_response = requests.post(execute_url, json=search_params)
+        execute_response = session.post(execute_url, json=search_params)
         
         if execute_response.status_code != 200:
             return {
@@ -75,30 +81,22 @@ def search_with_searxng_mcp(query, mcp_url="http://localhost:8081", num_results=
         if not execution_id:
             return {"error": "No execution ID received"}
         
-        # Step 3: Poll for results
+        # Step 3: Wait for results with a single long-poll request
         result_url = f"{mcp_url}/tools/{tool_id}/executions/{execution_id}"
-        max_attempts = 10
-        attempt = 0
+        result_response = session.get(result_url, params={"wait": wait})
+        
+        if result_response.status_code != 200:
+            return {
+                "error": f"Failed to get results: HTTP {result_response.status_code}",
+                "details": result_response.text
+            }
+        
+        result_data = result_response.json()
         
-        while attempt < max_attempts:
-            attempt += 1
-            result_response = requests.get(result_url)
-            
-            if result_response.status_code != 200:
-                return {
-                    "error": f"Failed to get results: HTTP {result_response.status_code}",
-                    "details": result_response.text
-                }
-            
-            result_data = result_response.json()
-            
-            if result_data.get("status") == "success":
-                return result_data.get("result", {})
-            elif result_data.get("status") == "error":
-                return {"error": result_data.get("error", "Unknown error")}
-            
-            # Wait before polling again
-            time.sleep(0.5)
+        if result_data.get("status") == "success":
+            return result_data.get("result", {})
+        elif result_data.get("status") == "error":
+            return {"error": result_data.get("error", "Unknown error")}
         
         return {"error": "Timed out waiting for results"}
     
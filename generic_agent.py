@@ -3,17 +3,12 @@
 import os
 import sys
 import argparse
-from dataclasses import dataclass
-from typing import Optional, List, Dict, Any, Union
+import functools
+from typing import Optional, List, Dict, Any
 import asyncio
-import json
 
 import dotenv
 from agent_core import Agent
-import ollama
-
-# Import Supabase client
-from supabase import create_client, Client as SupabaseClient
 
 from utils import (
     get_supabase_client,
@@ -33,15 +28,15 @@ if missing_vars:
     sys.exit(1)
 
 
-@dataclass
-class AgentDeps:
-    """Dependencies for the generic agent."""
-    supabase_client: SupabaseClient
-    table_name: str
+# Create a function to get the agent with the specified Ollama model.
+# Agents are cached per model so repeated runs don't rebuild them; the model is
+# always passed positionally so get_agent() and get_agent("llama2") share an entry.
+def get_agent(model: str = "llama2"):
+    return _get_agent(model)
 
 
-# Create a function to get the agent with the specified Ollama model
-def get_agent(model: str = "llama2"):
+@functools.lru_cache(maxsize=8)
+def _get_agent(model: str):
     return Agent(
         model=model,  # Use Ollama model directly
 
@@ -67,12 +62,9 @@ async def query_knowledge_base(search_query: str, n_results: int = 5) -> str:
     Returns:
         Formatted context information from the retrieved data.
     """
-    # Create Supabase client
-    supabase = get_supabase_client()
-    
-    # Query Supabase
+    # Query Supabase; the shared client is created on first use, not at import
     query_results = await query_supabase_collection(
-        supabase,
+        get_supabase_client(),
         "knowledge_base",
         search_query,
         n_results=n_results
@@ -116,12 +108,6 @@ async def run_generic_agent(
     Returns:
         The agent's response.
     """
-    # Create dependencies
-    deps = AgentDeps(
-        supabase_client=get_supabase_client(),
-        table_name=table_name
-    )
-    
     # Get agent with specified model
     current_agent = get_agent(model)
     
@@ -8,24 +8,18 @@ to enable integration with ProPosAgent.
 
 import os
 import json
+import sys
 import asyncio
-import subprocess
 import uuid
 from typing import Dict, List, Any, Optional
-import urllib.parse
 import httpx
+from cachetools import TTLCache
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 
-# Start SearXNG in background
-def start_searxng():
-    subprocess.Popen(
-        ["python", "-m", "searx.webapp"],
-        env={**os.environ, "SEARXNG_SETTINGS_PATH": "/app/settings.yml"}
-    )
-
 # Define API models
 class ToolParameters(BaseModel):
     query: str = Field(..., description="The search query")
@@ -46,7 +40,8 @@ class ExecutionRequest(BaseModel):
 app = FastAPI(
     title="searxng01",
     description="MCP-compatible API for SearXNG search engine",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Enable CORS
@@ -58,55 +53,105 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store execution state
-executions = {}
+# Store execution state, bounded so finished executions don't accumulate forever
+executions = TTLCache(maxsize=10_000, ttl=600)
+
+# Shared HTTP client for SearXNG requests, reused across executions
+http_client: Optional[httpx.AsyncClient] = None
+
+@app.on_event("startup")
+async def open_http_client():
+    global http_client
+    http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(10.0, connect=2.0),
+        limits=httpx.Limits(max_keepalive_connections=100)
+    )
+
+@app.on_event("shutdown")
+async def close_http_client():
+    if http_client is not None:
+        await http_client.aclose()
+
+# SearXNG process, started alongside the API
+searxng_process: Optional[asyncio.subprocess.Process] = None
+
+# Start SearXNG in background and wait until it is ready
+@app.on_event("startup")
+async def start_searxng():
+    global searxng_process
+    searxng_process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "searx.webapp",
+        env={**os.environ, "SEARXNG_SETTINGS_PATH": "/app/settings.yml"}
+    )
+    
+    # Poll the health endpoint rather than sleeping for a fixed time
+    for _ in range(50):
+        if searxng_process.returncode is not None:
+            break
+        try:
+            response = await http_client.get("http://localhost:8888/healthz")
+            if response.status_code == 200:
+                break
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+
+@app.on_event("shutdown")
+async def stop_searxng():
+    if searxng_process is not None and searxng_process.returncode is None:
+        searxng_process.terminate()
+        await searxng_process.wait()
 
 # Search function
 async def perform_search(execution_id: str, parameters: ToolParameters):
+    # The entry may already have been evicted from the TTL cache, in which case nobody can poll for it
+    execution = executions.get(execution_id)
+    if execution is None:
+        return
+    
     try:
-        # URL encode query parameters
-        query = urllib.parse.quote(parameters.query)
-        format_param = "json"
-        
-        # Build URL for SearXNG API
-        url = f"http://localhost:8888/search?q={query}&format={format_param}"
+        # Build query parameters for SearXNG API; httpx handles the encoding
+        params = {"q": parameters.query, "format": "json"}
         
         # Add optional parameters if specified
         if parameters.num_results != 5:
-            url += f"&number={parameters.num_results}"
+            params["number"] = parameters.num_results
         
         if parameters.language != "all":
-            url += f"&language={parameters.language}"
+            params["language"] = parameters.language
             
         if parameters.categories != ["general"]:
             for category in parameters.categories:
-                url += f"&category_{category}=1"
+                params[f"category_{category}"] = 1
         
         # Make request to SearXNG
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            
-            if response.status_code != 200:
-                executions[execution_id] = {
-                    "status": "error",
-                    "error": f"SearXNG request failed with status {response.status_code}"
-                }
-                return
-            
-            # Parse results
-            search_results = response.json()
-            
-            # Update execution status
-            executions[execution_id] = {
-                "status": "success",
-                "result": search_results
-            }
-            
+        response = await http_client.get("http://localhost:8888/search", params=params)
+        
+        if response.status_code != 200:
+            execution.update({
+                "status": "error",
+                "error": f"SearXNG request failed with status {response.status_code}"
+            })
+            return
+        
+        # Parse results
+        search_results = response.json()
+        
+        # Update execution status
+        execution.update({
+            "status": "success",
+            "result": search_results
+        })
+        
     except Exception as e:
-        executions[execution_id] = {
+        execution.update({
             "status": "error",
             "error": f"Search failed: {str(e)}"
-        }
+        })
+    
+    finally:
+        # Wake up any long-polling status requests
+        execution["event"].set()
 
 # Routes for MCP API
 @app.get("/")
@@ -176,9 +221,10 @@ async def list_tools():
 async def execute_search(request: ExecutionRequest, background_tasks: BackgroundTasks):
     execution_id = str(uuid.uuid4())
     
-    # Store initial status
+    # Store initial status and the event that signals completion
     executions[execution_id] = {
-        "status": "in_progress"
+        "status": "in_progress",
+        "event": asyncio.Event()
     }
     
     # Execute search in background
@@ -190,11 +236,20 @@ async def execute_search(request: ExecutionRequest, background_tasks: Background
     )
 
 @app.get("/tools/searxng_search/executions/{execution_id}", response_model=ToolResponse)
-async def get_execution_status(execution_id: str):
-    if execution_id not in executions:
+async def get_execution_status(
+    execution_id: str,
+    wait: float = Query(default=0.0, ge=0.0, le=30.0, description="Seconds to wait for the execution to finish")
+):
+    execution = executions.get(execution_id)
+    if execution is None:
         raise HTTPException(status_code=404, detail="Execution not found")
     
-    execution = executions[execution_id]
+    # Long-poll: hold the request until the search finishes or the wait expires
+    if wait and execution["status"] == "in_progress":
+        try:
+            await asyncio.wait_for(execution["event"].wait(), wait)
+        except asyncio.TimeoutError:
+            pass
     
     return ToolResponse(
         status=execution["status"],
@@ -205,12 +260,6 @@ async def get_execution_status(execution_id: str):
 
 # Main entry point
 if __name__ == "__main__":
-    # Start SearXNG in the background
-    start_searxng()
-    
-    # Give SearXNG a moment to start up
-    asyncio.run(asyncio.sleep(2))
-    
-    # Start FastAPI with Uvicorn
+    # Start FastAPI with Uvicorn; SearXNG is launched by the startup handler
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -5,13 +5,31 @@ This module provides a standardized protocol for communication between
 multiple agents, enabling collaboration on complex tasks.
 """
 
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Set, Union
 from dataclasses import dataclass, field
+from collections import defaultdict, deque
 import asyncio
-import json
+import os
 import uuid
 import time
-from pydantic import BaseModel, Field
+import logging
+from pydantic import BaseModel, Field, PrivateAttr
+
+logger = logging.getLogger("pydantic_agent.a2a_protocol")
+
+
+def make_ids(n: int) -> List[str]:
+    """
+    Generate message IDs in bulk from a single read of the OS random source.
+    
+    Args:
+        n: Number of IDs to generate
+        
+    Returns:
+        List of random 128-bit IDs as hex strings, in the same format as Message.message_id
+    """
+    random_bytes = os.urandom(16 * n)
+    return [random_bytes[i:i + 16].hex() for i in range(0, 16 * n, 16)]
 
 
 class AgentInfo(BaseModel):
@@ -30,7 +48,7 @@ class Message(BaseModel):
     recipient_id: str = Field(..., description="ID of the receiving agent (or 'broadcast')")
     content: str = Field(..., description="Content of the message")
     type: str = Field(default="request", description="Type of message (request, response, broadcast, etc.)")
-    message_id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="Unique identifier for the message")
+    message_id: str = Field(default_factory=lambda: uuid.uuid4().hex, description="Unique identifier for the message")
     thread_id: Optional[str] = Field(None, description="Thread ID for conversation tracking")
     timestamp: float = Field(default_factory=time.time, description="Timestamp of the message creation")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata for the message")
@@ -50,6 +68,24 @@ class ThreadSummary(BaseModel):
     message_count: int = Field(default=0, description="Number of messages in the thread")
     last_activity: float = Field(default_factory=time.time, description="Timestamp of the last activity")
     status: str = Field(default="active", description="Status of the thread (active, resolved, etc.)")
+    
+    # Set mirror of participants for O(1) membership checks; not serialized
+    _participant_set: Set[str] = PrivateAttr(default_factory=set)
+    
+    def model_post_init(self, __context: Any) -> None:
+        """Post-initialization processing."""
+        self._participant_set = set(self.participants)
+    
+    def add_participant(self, agent_id: str) -> None:
+        """
+        Add an agent to the thread's participants if it isn't already there.
+        
+        Args:
+            agent_id: ID of the participating agent
+        """
+        if agent_id not in self._participant_set:
+            self._participant_set.add(agent_id)
+            self.participants.append(agent_id)
 
 
 class A2AProtocol:
@@ -62,18 +98,30 @@ class A2AProtocol:
     3. Collaboration patterns
     """
     
-    def __init__(self, hub_url: Optional[str] = None):
+    def __init__(
+        self,
+        hub_url: Optional[str] = None,
+        history_cap: int = 1000
+    ):
         """
         Initialize the A2A protocol handler.
         
         Args:
             hub_url: Optional URL of a central A2A hub for multi-process communication
+            history_cap: Maximum number of messages kept per thread; older ones are dropped
         """
         self.hub_url = hub_url
-        self.agents: Dict[str, Dict[str, Any]] = {}
-        self.message_queue: asyncio.Queue = asyncio.Queue()
-        self.message_history: Dict[str, List[Dict[str, Any]]] = {}
+        self.history_cap = history_cap
+        self.agents: Dict[str, AgentInfo] = {}
+        self.agent_runtime: Dict[str, Dict[str, Any]] = {}  # Mutable status fields by agent_id
+        self._agent_dict_cache: Dict[str, Dict[str, Any]] = {}  # Serialized agent entries by agent_id
+        self._agents_view_cache: List[Dict[str, Any]] = []
+        self._agents_view_dirty = True
+        self.inboxes: Dict[str, asyncio.Queue] = {}  # Serialized messages by recipient agent_id
+        self.message_history: Dict[str, deque] = {}
         self.thread_summaries: Dict[str, ThreadSummary] = {}
+        self.capability_index: Dict[str, Set[str]] = defaultdict(set)
+        self._dropped: Dict[str, int] = defaultdict(int)  # Broadcasts dropped on full inboxes by agent_id
     
     async def register_agent(self, agent_info: Union[AgentInfo, Dict[str, Any]]) -> bool:
         """
@@ -90,19 +138,23 @@ class A2AProtocol:
             agent_info = AgentInfo(**agent_info)
         
         if agent_info.id in self.agents:
-            print(f"Agent {agent_info.id} is already registered")
+            logger.debug("Agent %s is already registered", agent_info.id)
             return False
         
-        self.agents[agent_info.id] = {
-            "id": agent_info.id,
-            "name": agent_info.name,
-            "capabilities": agent_info.capabilities,
-            "metadata": agent_info.metadata or {},
-            "status": "active",
-            "registered_at": time.time()
-        }
+        runtime = {"status": "active", "registered_at": time.time()}
+        self.agents[agent_info.id] = agent_info
+        self.agent_runtime[agent_info.id] = runtime
+        self._agent_dict_cache[agent_info.id] = {**agent_info.model_dump(), **runtime}
+        self._agents_view_dirty = True
+        self.inboxes[agent_info.id] = asyncio.Queue(maxsize=1024)
         
-        print(f"Agent {agent_info.name} ({agent_info.id}) registered with capabilities: {agent_info.capabilities}")
+        for capability in agent_info.capabilities:
+            self.capability_index[capability].add(agent_info.id)
+        
+        logger.debug(
+            "Agent %s (%s) registered with capabilities: %s",
+            agent_info.name, agent_info.id, agent_info.capabilities
+        )
         return True
     
     async def unregister_agent(self, agent_id: str) -> bool:
@@ -116,11 +168,23 @@ class A2AProtocol:
             Success status
         """
         if agent_id not in self.agents:
-            print(f"Agent {agent_id} is not registered")
+            logger.debug("Agent %s is not registered", agent_id)
             return False
         
+        for capability in self.agents[agent_id].capabilities:
+            agent_ids = self.capability_index.get(capability)
+            if agent_ids is not None:
+                agent_ids.discard(agent_id)
+                if not agent_ids:
+                    del self.capability_index[capability]
+        
         del self.agents[agent_id]
-        print(f"Agent {agent_id} unregistered")
+        del self.agent_runtime[agent_id]
+        del self._agent_dict_cache[agent_id]
+        self._agents_view_dirty = True
+        self.inboxes.pop(agent_id, None)
+        self._dropped.pop(agent_id, None)
+        logger.debug("Agent %s unregistered", agent_id)
         return True
     
     async def send_message(self, message: Union[Message, Dict[str, Any]]) -> Dict[str, Any]:
@@ -137,55 +201,105 @@ class A2AProtocol:
         if isinstance(message, dict):
             message = Message(**message)
         
+        # Serialize once; the history and every inbox share this dict
+        return await self.send_message_raw(message.model_dump())
+    
+    async def send_message_raw(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send an already-serialized message without any validation.
+        
+        The caller is responsible for providing every Message field, including
+        message_id, thread_id and timestamp.
+        
+        Args:
+            payload: The message as a dictionary
+            
+        Returns:
+            Status and message details
+        """
+        sender_id = payload["sender_id"]
+        recipient_id = payload["recipient_id"]
+        
         # Check if sender and recipient are registered
-        if message.sender_id not in self.agents:
-            return {"status": "error", "error": f"Sender agent {message.sender_id} is not registered"}
+        if sender_id not in self.agents:
+            return {"status": "error", "error": f"Sender agent {sender_id} is not registered"}
+        
+        if recipient_id != "broadcast" and recipient_id not in self.agents:
+            return {"status": "error", "error": f"Recipient agent {recipient_id} is not registered"}
         
-        if message.recipient_id != "broadcast" and message.recipient_id not in self.agents:
-            return {"status": "error", "error": f"Recipient agent {message.recipient_id} is not registered"}
+        # Deliver the message to the recipient's inbox, or to every other agent for broadcasts
+        if recipient_id == "broadcast":
+            for agent_id, inbox in self.inboxes.items():
+                if agent_id == sender_id:
+                    continue
+                try:
+                    inbox.put_nowait(payload)
+                except asyncio.QueueFull:
+                    # Don't let one slow recipient block delivery to the others
+                    self._dropped[agent_id] += 1
+                    logger.warning("Inbox of agent %s is full; dropped broadcast %s", agent_id, payload["message_id"])
+        else:
+            try:
+                self.inboxes[recipient_id].put_nowait(payload)
+            except asyncio.QueueFull:
+                return {"status": "error", "error": f"Inbox of recipient agent {recipient_id} is full"}
+        
+        # Record the message right away so history readers never lag behind delivery.
+        # Nothing between the thread lookup and the summary update awaits, so
+        # concurrent senders on the loop cannot interleave and no lock is needed.
+        self._record_message(payload)
         
-        # Add message to queue and history
-        await self.message_queue.put(message)
+        return {
+            "status": "success", 
+            "message_id": payload["message_id"],
+            "thread_id": payload["thread_id"]
+        }
+    
+    def _record_message(self, payload: Dict[str, Any]) -> None:
+        """
+        Add a delivered message to its thread's history and summary.
         
-        if message.thread_id not in self.message_history:
-            self.message_history[message.thread_id] = []
+        Args:
+            payload: The serialized message
+        """
+        thread_id = payload["thread_id"]
+        sender_id = payload["sender_id"]
+        recipient_id = payload["recipient_id"]
+        
+        if thread_id not in self.message_history:
+            self.message_history[thread_id] = deque(maxlen=self.history_cap)
             
             # Create thread summary if it doesn't exist
-            if message.thread_id not in self.thread_summaries:
-                # Extract a title from the first few words of the message
-                title = message.content.split("\n", 1)[0][:50]
+            if thread_id not in self.thread_summaries:
+                # Extract a title from the first line of the message without splitting it
+                content = payload["content"]
+                newline = content.find("\n", 0, 50)
+                title = content[:newline if newline >= 0 else 50]
                 if len(title) == 50:
                     title += "..."
                 
-                self.thread_summaries[message.thread_id] = ThreadSummary(
-                    thread_id=message.thread_id,
+                self.thread_summaries[thread_id] = ThreadSummary(
+                    thread_id=thread_id,
                     title=title,
-                    participants=[message.sender_id, message.recipient_id],
+                    participants=[sender_id, recipient_id],
                     message_count=1,
-                    last_activity=message.timestamp,
+                    last_activity=payload["timestamp"],
                     status="active"
                 )
         else:
             # Update thread summary
-            summary = self.thread_summaries.get(message.thread_id)
+            summary = self.thread_summaries.get(thread_id)
             if summary:
                 summary.message_count += 1
-                summary.last_activity = message.timestamp
+                summary.last_activity = payload["timestamp"]
                 
                 # Add participants if they're not already there
-                if message.sender_id not in summary.participants:
-                    summary.participants.append(message.sender_id)
-                if message.recipient_id not in summary.participants and message.recipient_id != "broadcast":
-                    summary.participants.append(message.recipient_id)
+                summary.add_participant(sender_id)
+                if recipient_id != "broadcast":
+                    summary.add_participant(recipient_id)
         
         # Add message to history
-        self.message_history[message.thread_id].append(message.dict())
-        
-        return {
-            "status": "success", 
-            "message_id": message.message_id,
-            "thread_id": message.thread_id
-        }
+        self.message_history[thread_id].append(payload)
     
     async def receive_messages(self, agent_id: str, timeout: float = 0.1) -> List[Dict[str, Any]]:
         """
@@ -193,26 +307,30 @@ class A2AProtocol:
         
         Args:
             agent_id: ID of the agent to receive messages for
-            timeout: Time to wait for messages
+            timeout: Maximum time in seconds to wait for the first message
             
         Returns:
             List of messages for the agent
         """
-        messages = []
-        
         # Check if agent is registered
         if agent_id not in self.agents:
             return []
         
-        # Process queue with timeout
+        inbox = self.inboxes[agent_id]
+        messages = []
+        
+        # Only sleep when nothing is queued yet; wait_for(timeout=0) raises
+        # even for a non-empty queue before Python 3.12
+        if inbox.empty():
+            try:
+                messages.append(await asyncio.wait_for(inbox.get(), timeout))
+            except asyncio.TimeoutError:
+                return []
+        
+        # Drain whatever else is already waiting
         try:
             while True:
-                message = self.message_queue.get_nowait()
-                
-                if message.recipient_id == agent_id or message.recipient_id == "broadcast":
-                    messages.append(message.dict())
-                
-                self.message_queue.task_done()
+                messages.append(inbox.get_nowait())
         except asyncio.QueueEmpty:
             pass
         
@@ -228,13 +346,31 @@ class A2AProtocol:
         Returns:
             List of agents with the specified capability
         """
-        matching_agents = []
+        return [self._agent_dict_cache[agent_id] for agent_id in self.capability_index.get(capability, ())]
+    
+    def get_all_agents(self) -> List[Dict[str, Any]]:
+        """
+        Get all registered agents.
         
-        for agent_id, agent_info in self.agents.items():
-            if capability in agent_info["capabilities"]:
-                matching_agents.append(agent_info)
+        The list is rebuilt only after agents register or unregister, so callers
+        must treat it as read-only.
         
-        return matching_agents
+        Returns:
+            List of registered agents with their details
+        """
+        if self._agents_view_dirty:
+            self._agents_view_cache = list(self._agent_dict_cache.values())
+            self._agents_view_dirty = False
+        return self._agents_view_cache
+    
+    def get_dropped_counts(self) -> Dict[str, int]:
+        """
+        Get the number of broadcasts dropped because an agent's inbox was full.
+        
+        Returns:
+            Dictionary mapping agent IDs to dropped message counts
+        """
+        return dict(self._dropped)
     
     def get_thread_history(self, thread_id: str) -> List[Dict[str, Any]]:
         """
@@ -244,9 +380,9 @@ class A2AProtocol:
             thread_id: ID of the thread
             
         Returns:
-            List of messages in the thread
+            List of the most recent messages in the thread (up to history_cap)
         """
-        return self.message_history.get(thread_id, [])
+        return list(self.message_history.get(thread_id, ()))
     
     def get_all_threads(self) -> List[ThreadSummary]:
         """
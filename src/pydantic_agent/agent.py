@@ -7,11 +7,16 @@ protocol for agent collaboration.
 """
 
 import os
+import re
 import sys
+import time
+import uuid
 import asyncio
-from typing import Dict, List, Any, Optional, Union, Callable
+import weakref
+from typing import Dict, List, Any, Optional, Union, Callable, Tuple
 import json
 import logging
+from collections import defaultdict
 
 import ollama
 from pydantic_ai import RunContext
@@ -20,7 +25,7 @@ from supabase import create_client
 
 from .models import AgentDependencies
 from .mcp_client import MCPClient, MCPTool, MCPToolResponse
-from .a2a_protocol import A2AProtocol, AgentInfo, Message
+from .a2a_protocol import A2AProtocol, AgentInfo
 from .supabase_client import SupabaseVectorClient
 
 # Configure logging
@@ -30,6 +35,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger("pydantic_agent")
 
+# Matches MCP server environment variables and captures the server index
+MCP_SERVER_ENV_PATTERN = re.compile(r"^MCP_SERVER_(\d+)_")
+
+# A2A protocols shared by agents that aren't given their own, one per event loop,
+# since each protocol's inboxes are asyncio queues bound to a single loop
+_DEFAULT_A2A: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, A2AProtocol]" = weakref.WeakKeyDictionary()
+
+
+def get_default_a2a_protocol() -> A2AProtocol:
+    """
+    Get the A2A protocol shared by agents on the running event loop.
+    
+    Returns:
+        The running loop's default protocol, created on first use
+    """
+    loop = asyncio.get_running_loop()
+    protocol = _DEFAULT_A2A.get(loop)
+    if protocol is None:
+        protocol = _DEFAULT_A2A[loop] = A2AProtocol()
+    return protocol
+
 
 class PydanticAgent:
     """
@@ -48,7 +74,8 @@ class PydanticAgent:
         agent_name: str,
         ollama_model: str = "llama3",
         ollama_base_url: str = "http://localhost:11434",
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        a2a_protocol: Optional[A2AProtocol] = None
     ):
         """
         Initialize the Pydantic Agent.
@@ -59,11 +86,15 @@ class PydanticAgent:
             ollama_model: Ollama model to use for inference
             ollama_base_url: Base URL for Ollama API
             system_prompt: Optional custom system prompt
+            a2a_protocol: Optional A2A protocol to join; defaults to one shared per event loop
         """
         self.agent_id = agent_id
         self.agent_name = agent_name
         self.ollama_model = ollama_model
         self.ollama_base_url = ollama_base_url
+        self._a2a_protocol = a2a_protocol
+        self._registered_protocol: Optional[A2AProtocol] = None  # Protocol this agent is registered with
+        self._owns_registration = False  # Whether this instance created that registration
         
         # Set default system prompt if none provided
         if system_prompt is None:
@@ -83,9 +114,23 @@ class PydanticAgent:
         # Initialize MCP client
         self.mcp_client = MCPClient()
         
+        # MCP server configs by server ID, plus the (name, url) pairs already registered
+        self.mcp_server_configs: Dict[str, Dict[str, Any]] = {}
+        self._mcp_server_keys: Dict[Tuple[Optional[str], str], str] = {}
+        
         # Initialize Ollama client
         self.ollama_client = ollama.Client(host=ollama_base_url)
         
+        # Supabase clients keyed by (url, key), reused across runs
+        self._supabase_clients: Dict[Tuple[str, str], Any] = {}
+        
+        # Run dependencies keyed by (url, key, table_name), reused across runs
+        self._deps_cache: Dict[Tuple[str, str, str], AgentDependencies] = {}
+        
+        # Load MCP servers from environment once
+        for server_config in self._load_mcp_servers_from_env():
+            self._add_mcp_server(server_config)
+        
         # Register tools
         self._register_tools()
     
@@ -124,25 +169,25 @@ class PydanticAgent:
             if not results:
                 return "No relevant information found in the knowledge base."
             
-            # Format results as context
-            context_str = "CONTEXT INFORMATION:\n\n"
+            # Format results as context, joining the parts once at the end
+            parts = ["CONTEXT INFORMATION:\n\n"]
             
-            for i, doc in enumerate(results):
-                context_str += f"Document {i+1}"
-                if "relevance" in doc:
-                    context_str += f" (Relevance: {doc['relevance']:.2f})"
-                context_str += ":\n"
+            for i, doc in enumerate(results, 1):
+                relevance = doc.get("relevance")
+                if relevance is not None:
+                    parts.append(f"Document {i} (Relevance: {relevance:.2f}):\n")
+                else:
+                    parts.append(f"Document {i}:\n")
                 
                 # Add metadata if available
-                if "metadata" in doc and doc["metadata"]:
-                    metadata = doc["metadata"]
-                    for key, value in metadata.items():
-                        context_str += f"{key}: {value}\n"
+                metadata = doc.get("metadata")
+                if metadata:
+                    parts.extend(f"{key}: {value}\n" for key, value in metadata.items())
                 
                 # Add content
-                context_str += f"Content: {doc['content']}\n\n"
+                parts.append(f"Content: {doc['content']}\n\n")
             
-            return context_str
+            return "".join(parts)
         
         @self.agent.tool
         async def call_mcp_tool(
@@ -170,7 +215,7 @@ class PydanticAgent:
             
             try:
                 # Use the MCP client to execute the tool
-                response = await self.mcp_client.execute_tool(
+                response = await context.deps.mcp_client.execute_tool(
                     tool_id=tool_id,
                     parameters=parameters,
                     api_key=api_key,
@@ -208,7 +253,7 @@ class PydanticAgent:
             
             try:
                 # Use the MCP client to discover tools
-                tools = await self.mcp_client.discover_tools(server_id, api_key)
+                tools = await context.deps.mcp_client.discover_tools(server_id, api_key)
                 
                 # Convert to simple dictionaries for the LLM
                 return [
@@ -245,17 +290,21 @@ class PydanticAgent:
             Returns:
                 Status of the message delivery
             """
-            # Create message
-            message = Message(
-                sender_id=context.deps.agent_id,
-                recipient_id=recipient_id,
-                content=content,
-                type=message_type,
-                thread_id=thread_id
-            )
+            # Build the message fields directly; they are all known to be valid here
+            message_id = uuid.uuid4().hex
+            payload = {
+                "sender_id": context.deps.agent_id,
+                "recipient_id": recipient_id,
+                "content": content,
+                "type": message_type,
+                "message_id": message_id,
+                "thread_id": thread_id or message_id,
+                "timestamp": time.time(),
+                "metadata": {}
+            }
             
             # Send message
-            result = await context.deps.a2a_protocol.send_message(message)
+            result = await context.deps.a2a_protocol.send_message_raw(payload)
             
             return result
         
@@ -277,10 +326,7 @@ class PydanticAgent:
             if capability:
                 agents = context.deps.a2a_protocol.get_agents_with_capability(capability)
             else:
-                agents = [
-                    agent_info for agent_id, agent_info in 
-                    context.deps.a2a_protocol.agents.items()
-                ]
+                agents = context.deps.a2a_protocol.get_all_agents()
             
             return agents
     
@@ -305,45 +351,8 @@ class PydanticAgent:
         Returns:
             The agent's response
         """
-        # Create Supabase client
-        supabase_client = create_client(supabase_url, supabase_key)
-        
-        # Initialize A2A protocol
-        a2a_protocol = A2AProtocol()
-        
-        # Register this agent with the A2A protocol
-        await a2a_protocol.register_agent(AgentInfo(
-            id=self.agent_id,
-            name=self.agent_name,
-            capabilities=["text_processing", "knowledge_retrieval", "tool_execution"]
-        ))
-        
-        # Process MCP servers
-        mcp_server_configs = {}
-        
-        # First, try to load MCP servers from environment
-        env_servers = self._load_mcp_servers_from_env()
-        for server_config in env_servers:
-            server_id = self.mcp_client.add_server(server_config)
-            mcp_server_configs[server_id] = server_config
-        
-        # Then add any additional servers passed directly
-        if mcp_servers:
-            for server_config in mcp_servers:
-                server_id = self.mcp_client.add_server(server_config)
-                mcp_server_configs[server_id] = server_config
-        
-        # Create dependencies
-        deps = AgentDependencies(
-            supabase_client=supabase_client,
-            table_name=table_name,
-            a2a_protocol=a2a_protocol,
-            agent_id=self.agent_id,
-            agent_name=self.agent_name,
-            mcp_servers=mcp_server_configs,
-            ollama_base_url=self.ollama_base_url,
-            ollama_model=self.ollama_model
-        )
+        # Everything except the input text is prepared once and reused
+        deps = await self.prepare(supabase_url, supabase_key, table_name, mcp_servers)
         
         try:
             # Run the agent
@@ -369,12 +378,135 @@ class PydanticAgent:
                 }
             }
         
-        finally:
-            # Unregister from A2A protocol
-            await a2a_protocol.unregister_agent(self.agent_id)
-        
         return response
-
+    
+    async def prepare(
+        self,
+        supabase_url: str,
+        supabase_key: str,
+        table_name: str = "knowledge_base",
+        mcp_servers: Optional[List[Dict[str, Any]]] = None
+    ) -> AgentDependencies:
+        """
+        Build the dependencies for a run, reusing them across runs with the same settings.
+        
+        Args:
+            supabase_url: URL of the Supabase project
+            supabase_key: API key for Supabase
+            table_name: Name of the Supabase table containing knowledge
+            mcp_servers: List of MCP server configurations
+            
+        Returns:
+            The dependencies to pass to the agent
+        """
+        # Make sure this agent is registered with the A2A protocol
+        await self.start()
+        
+        # Add any servers passed directly that aren't registered yet
+        if mcp_servers:
+            for server_config in mcp_servers:
+                self._add_mcp_server(server_config)
+        
+        key = (supabase_url, supabase_key, table_name)
+        deps = self._deps_cache.get(key)
+        if deps is not None:
+            # The default protocol depends on the running loop
+            deps.a2a_protocol = self.a2a_protocol
+        else:
+            # The MCP server configs are shared, so cached deps see servers added later
+            deps = self._deps_cache[key] = AgentDependencies(
+                supabase_client=self._get_supabase_client(supabase_url, supabase_key),
+                table_name=table_name,
+                a2a_protocol=self.a2a_protocol,
+                agent_id=self.agent_id,
+                agent_name=self.agent_name,
+                mcp_servers=self.mcp_server_configs,
+                mcp_client=self.mcp_client,
+                ollama_base_url=self.ollama_base_url,
+                ollama_model=self.ollama_model
+            )
+        return deps
+    
+    @property
+    def a2a_protocol(self) -> A2AProtocol:
+        """
+        The A2A protocol this agent joins.
+        
+        Without an injected protocol this is the running event loop's default,
+        so it must be read from a coroutine.
+        """
+        if self._a2a_protocol is not None:
+            return self._a2a_protocol
+        return get_default_a2a_protocol()
+    
+    async def start(self) -> None:
+        """
+        Register this agent with the A2A protocol so other agents can discover it.
+        
+        Safe to call more than once; the agent stays registered until close().
+        If another agent already registered this ID, that registration is used
+        as-is and left for its owner to remove.
+        """
+        protocol = self.a2a_protocol
+        if self._registered_protocol is not protocol:
+            registered = await protocol.register_agent(AgentInfo(
+                id=self.agent_id,
+                name=self.agent_name,
+                capabilities=["text_processing", "knowledge_retrieval", "tool_execution"]
+            ))
+            
+            # An agent already registered under this ID counts, so runs don't retry every time
+            if registered or self.agent_id in protocol.agents:
+                self._registered_protocol = protocol
+                self._owns_registration = registered
+    
+    async def close(self) -> None:
+        """Unregister this agent from the A2A protocol and close the MCP client's connections."""
+        if self._registered_protocol is not None and self._owns_registration:
+            await self._registered_protocol.unregister_agent(self.agent_id)
+        self._registered_protocol = None
+        self._owns_registration = False
+        await self.mcp_client.aclose()
+    
+    def _add_mcp_server(self, server_config: Dict[str, Any]) -> str:
+        """
+        Register an MCP server with the client unless it is already registered.
+        
+        Args:
+            server_config: Server configuration dictionary
+            
+        Returns:
+            The server ID
+        """
+        key = (server_config.get("name"), server_config["url"])
+        server_id = self._mcp_server_keys.get(key)
+        if server_id is None:
+            server_id = self.mcp_client.add_server(server_config)
+            self._mcp_server_keys[key] = server_id
+            self.mcp_server_configs[server_id] = server_config
+            
+            # Cached deps share mcp_server_configs, so their masked views are now stale
+            for deps in self._deps_cache.values():
+                deps.invalidate_mcp_servers()
+        return server_id
+    
+    def _get_supabase_client(self, supabase_url: str, supabase_key: str) -> Any:
+        """
+        Get a cached Supabase client, creating it on first use.
+        
+        Args:
+            supabase_url: URL of the Supabase project
+            supabase_key: API key for Supabase
+            
+        Returns:
+            The Supabase client for these credentials
+        """
+        key = (supabase_url, supabase_key)
+        supabase_client = self._supabase_clients.get(key)
+        if supabase_client is None:
+            supabase_client = self._supabase_clients[key] = create_client(supabase_url, supabase_key)
+        return supabase_client
+    
     def _load_mcp_servers_from_env(self) -> List[Dict[str, Any]]:
         """
         Load MCP server configurations from environment variables.
@@ -382,43 +514,46 @@ class PydanticAgent:
         Environment variables should follow the pattern:
         MCP_SERVER_<N>_<FIELD>=value
         
+        Server indices are discovered in a single pass over the environment,
+        so they don't need to be contiguous.
+        
         Returns:
             List of server configurations
         """
         servers = []
-        server_index = 1
         
-        while True:
-            prefix = f"MCP_SERVER_{server_index}_"
-            
-            # Check if this server exists in env
-            if not any(key.startswith(prefix) for key in os.environ):
-                break
+        # Group every server's fields by index in a single pass over the environment
+        env_by_index: Dict[int, Dict[str, str]] = defaultdict(dict)
+        for key, value in os.environ.items():
+            match = MCP_SERVER_ENV_PATTERN.match(key)
+            if match:
+                env_by_index[int(match.group(1))][key[match.end():]] = value
+        
+        for server_index in sorted(env_by_index):
+            fields = env_by_index[server_index]
             
             # Build server config
             config = {
-                "name": os.getenv(f"{prefix}NAME"),
-                "url": os.getenv(f"{prefix}URL"),
-                "auth_type": os.getenv(f"{prefix}AUTH_TYPE", "api_key"),
-                "description": os.getenv(f"{prefix}DESCRIPTION", ""),
+                "name": fields.get("NAME"),
+                "url": fields.get("URL"),
+                "auth_type": fields.get("AUTH_TYPE", "api_key"),
+                "description": fields.get("DESCRIPTION", ""),
             }
             
             # Only include if required fields are present
             if config["name"] and config["url"]:
                 # Add auth details if present
                 if config["auth_type"] == "api_key":
-                    api_key = os.getenv(f"{prefix}API_KEY")
+                    api_key = fields.get("API_KEY")
                     if api_key:
                         config["api_key"] = api_key
                 elif config["auth_type"] == "oauth":
-                    client_id = os.getenv(f"{prefix}CLIENT_ID")
-                    client_secret = os.getenv(f"{prefix}CLIENT_SECRET")
+                    client_id = fields.get("CLIENT_ID")
+                    client_secret = fields.get("CLIENT_SECRET")
                     if client_id and client_secret:
                         config["client_id"] = client_id
                         config["client_secret"] = client_secret
                 
                 servers.append(config)
-            
-            server_index += 1
         
         return servers
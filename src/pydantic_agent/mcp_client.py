@@ -7,18 +7,26 @@ standards defined in the MCP GitHub repository.
 
 import os
 import json
+import tempfile
 import asyncio
-from typing import Dict, List, Any, Optional, Union
+import hashlib
+import logging
+from typing import Dict, List, Any, Optional, Tuple, Union
 import urllib.parse
 from dataclasses import dataclass
 
 import aiohttp
-from pydantic import BaseModel, Field
+import orjson
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, TypeAdapter
+
+logger = logging.getLogger("pydantic_agent.mcp_client")
 
 
 class MCPTool(BaseModel):
     """Model representing an MCP tool."""
     
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     id: str = Field(..., description="Unique identifier for the tool")
     name: str = Field(..., description="Human-readable name of the tool")
     description: str = Field(..., description="Description of what the tool does")
@@ -34,17 +42,62 @@ class MCPTool(BaseModel):
 class MCPServer(BaseModel):
     """Model representing an MCP server."""
     
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     id: str = Field(..., description="Unique identifier for the server")
     name: str = Field(..., description="Human-readable name of the server")
     url: str = Field(..., description="Base URL of the server")
     description: str = Field(default="", description="Description of the server")
     auth_type: str = Field(default="api_key", description="Authentication type (api_key, oauth, none)")
     tools: List[MCPTool] = Field(default_factory=list, description="List of tools provided by this server")
+    
+    # Endpoints, built once per server (and per tool) rather than on every request
+    _tools_url: str = PrivateAttr(default="")
+    _execute_urls: Dict[str, str] = PrivateAttr(default_factory=dict)
+    
+    def model_post_init(self, __context: Any) -> None:
+        """Post-initialization processing."""
+        self._tools_url = f"{self.url}/tools"
+    
+    @property
+    def tools_url(self) -> str:
+        """URL of the server's tool catalog."""
+        return self._tools_url
+    
+    def execute_url(self, tool_id: str) -> str:
+        """
+        Get the URL that executes a tool on this server.
+        
+        Args:
+            tool_id: ID of the tool
+            
+        Returns:
+            The tool's execute endpoint
+        """
+        url = self._execute_urls.get(tool_id)
+        if url is None:
+            url = self._execute_urls[tool_id] = f"{self._tools_url}/{tool_id}/execute"
+        return url
+    
+    def status_url(self, tool_id: str, execution_id: str) -> str:
+        """
+        Get the URL that reports the status of a tool execution on this server.
+        
+        Args:
+            tool_id: ID of the tool
+            execution_id: ID of the execution
+            
+        Returns:
+            The execution's status endpoint
+        """
+        return f"{self._tools_url}/{tool_id}/executions/{execution_id}"
 
 
 class MCPToolResponse(BaseModel):
     """Model representing an MCP tool execution response."""
     
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     tool_id: str = Field(..., description="ID of the executed tool")
     status: str = Field(..., description="Status of the execution (success, error, in_progress)")
     execution_id: Optional[str] = Field(None, description="ID of the execution for async operations")
@@ -52,6 +105,29 @@ class MCPToolResponse(BaseModel):
     error: Optional[str] = Field(None, description="Error message if execution failed")
 
 
+# Maximum number of bytes of an error response body included in error messages
+ERROR_BODY_LIMIT = 4096
+
+
+async def _err_body(response: aiohttp.ClientResponse, limit: int = ERROR_BODY_LIMIT) -> str:
+    """
+    Read the start of an error response body without loading all of it.
+    
+    Args:
+        response: The HTTP response
+        limit: Maximum number of bytes to read
+        
+    Returns:
+        The decoded start of the body
+    """
+    return (await response.content.read(limit)).decode("utf-8", "replace")
+
+
+# Validators built once at import instead of on every response
+_TOOL_LIST_ADAPTER = TypeAdapter(List[MCPTool])
+_RESPONSE_ADAPTER = TypeAdapter(MCPToolResponse)
+
+
 class MCPClient:
     """
     Client for interacting with MCP servers.
@@ -60,19 +136,106 @@ class MCPClient:
     for discovering and executing tools across multiple MCP servers.
     """
     
-    def __init__(self, servers: Optional[List[Dict[str, Any]]] = None):
+    def __init__(
+        self,
+        servers: Optional[List[Dict[str, Any]]] = None,
+        tool_cache_dir: Optional[str] = None
+    ):
         """
         Initialize the MCP client.
         
         Args:
             servers: Optional list of server configurations to register immediately
+            tool_cache_dir: Optional directory for tool catalogs saved after each successful
+                discovery, used only when discovery is explicitly allowed to fall back on them
         """
         self.servers: Dict[str, MCPServer] = {}
+        self.tool_cache_dir = tool_cache_dir
+        self._tool_index: Dict[str, Tuple[str, MCPTool]] = {}  # (server_id, tool) by tool ID
+        self._headers_cache: Dict[Optional[str], Dict[str, str]] = {}  # Request headers by API key
+        
+        # Pooled HTTP sessions by event loop, each with a task that closes it when its loop shuts down
+        self._sessions: Dict[asyncio.AbstractEventLoop, Tuple[aiohttp.ClientSession, asyncio.Task]] = {}
         
         if servers:
             for server_config in servers:
                 self.add_server(server_config)
     
+    async def __aenter__(self) -> "MCPClient":
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the pooled HTTP session, creating it if needed.
+        
+        Returns:
+            An open aiohttp session bound to the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._sessions.get(loop)
+        if entry is None or entry[0].closed:
+            # Forget sessions whose loops are gone; their closers already ran at shutdown
+            for session_loop in [session_loop for session_loop in self._sessions if session_loop.is_closed()]:
+                del self._sessions[session_loop]
+            
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, limit_per_host=20, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+            entry = self._sessions[loop] = (session, loop.create_task(self._close_on_shutdown(session)))
+        return entry[0]
+    
+    @staticmethod
+    async def _close_on_shutdown(session: aiohttp.ClientSession) -> None:
+        """
+        Close a session once this task is cancelled.
+        
+        asyncio.run() cancels leftover tasks before closing its loop, so a
+        session is closed on its own loop even if aclose() is never called
+        there.
+        
+        Args:
+            session: The session to close
+        """
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            await session.close()
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP sessions on every event loop that is still open."""
+        loop = asyncio.get_running_loop()
+        sessions, self._sessions = self._sessions, {}
+        
+        for session_loop, (session, closer) in sessions.items():
+            if session_loop is loop:
+                closer.cancel()
+                await asyncio.gather(closer, return_exceptions=True)
+            elif not session_loop.is_closed():
+                # The session belongs to another thread's loop; close it there
+                session_loop.call_soon_threadsafe(closer.cancel)
+    
+    def _get_headers(self, api_key: Optional[str]) -> Dict[str, str]:
+        """
+        Get the request headers for an API key, building them once per key.
+        
+        Args:
+            api_key: Optional API key for authenticated requests
+            
+        Returns:
+            The shared headers dictionary; callers must not modify it
+        """
+        headers = self._headers_cache.get(api_key)
+        if headers is None:
+            headers = {"Content-Type": "application/json"}
+            if api_key:
+                headers["Authorization"] = f"Bearer {api_key}"
+            self._headers_cache[api_key] = headers
+        return headers
+    
     def add_server(self, config: Dict[str, Any]) -> str:
         """
         Add an MCP server to the client.
@@ -83,20 +246,84 @@ class MCPClient:
         Returns:
             The server ID
         """
-        server_id = config.get("id", str(hash(config["url"])))
+        # Derive a stable default ID so cached tool catalogs can be found again
+        server_id = config.get("id") or hashlib.blake2b(config["url"].encode("utf-8"), digest_size=8).hexdigest()
         
+        # Tools are only known once discover_tools() has reached the server
         server = MCPServer(
             id=server_id,
             name=config.get("name", f"MCP Server {len(self.servers) + 1}"),
             url=config["url"].rstrip("/"),
             description=config.get("description", ""),
-            auth_type=config.get("auth_type", "api_key"),
-            tools=[]
+            auth_type=config.get("auth_type", "api_key")
         )
         
+        self._unindex_tools(server_id)
         self.servers[server_id] = server
         return server_id
     
+    def _tool_cache_path(self, server_id: str) -> Optional[str]:
+        """
+        Get the path of a server's cached tool catalog.
+        
+        Args:
+            server_id: ID of the server
+            
+        Returns:
+            The cache file path, or None if caching is disabled
+        """
+        if self.tool_cache_dir is None:
+            return None
+        return os.path.join(self.tool_cache_dir, f"{server_id}.json")
+    
+    def _load_cached_tools(self, server_id: str) -> List[MCPTool]:
+        """
+        Load a server's tool catalog from the on-disk cache.
+        
+        Args:
+            server_id: ID of the server
+            
+        Returns:
+            The cached tools, or an empty list if there is no usable cache
+        """
+        path = self._tool_cache_path(server_id)
+        if path is None or not os.path.exists(path):
+            return []
+        
+        try:
+            with open(path, "rb") as f:
+                return _TOOL_LIST_ADAPTER.validate_python(orjson.loads(f.read()))
+        except (OSError, ValueError) as e:
+            logger.debug("Ignoring unreadable tool cache %s: %s", path, e)
+            return []
+    
+    def _save_cached_tools(self, server_id: str, tools: List[MCPTool]) -> None:
+        """
+        Write a server's tool catalog to the on-disk cache.
+        
+        Args:
+            server_id: ID of the server
+            tools: The discovered tools
+        """
+        path = self._tool_cache_path(server_id)
+        if path is None:
+            return
+        
+        try:
+            os.makedirs(self.tool_cache_dir, exist_ok=True)
+            
+            # Write to a temporary file and swap it in, so readers never see a partial catalog
+            fd, tmp_path = tempfile.mkstemp(dir=self.tool_cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(orjson.dumps([tool.model_dump(mode="json") for tool in tools]))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.debug("Could not write tool cache %s: %s", path, e)
+    
     def remove_server(self, server_id: str) -> bool:
         """
         Remove an MCP server from the client.
@@ -108,17 +335,41 @@ class MCPClient:
             True if the server was removed, False if it wasn't found
         """
         if server_id in self.servers:
+            self._unindex_tools(server_id)
             del self.servers[server_id]
             return True
         return False
     
-    async def discover_tools(self, server_id: str, api_key: Optional[str] = None) -> List[MCPTool]:
+    def _unindex_tools(self, server_id: str) -> None:
+        """
+        Remove a server's current tools from the tool index.
+        
+        Args:
+            server_id: ID of the server whose tools to remove
+        """
+        server = self.servers.get(server_id)
+        if server is None:
+            return
+        
+        for tool in server.tools:
+            entry = self._tool_index.get(tool.id)
+            if entry is not None and entry[0] == server_id:
+                del self._tool_index[tool.id]
+    
+    async def discover_tools(
+        self,
+        server_id: str,
+        api_key: Optional[str] = None,
+        allow_cached: bool = False
+    ) -> List[MCPTool]:
         """
         Discover tools available on an MCP server.
         
         Args:
             server_id: ID of the server to discover tools from
             api_key: Optional API key for authenticated discovery
+            allow_cached: Whether to fall back on the catalog saved by an earlier
+                successful discovery if the server can't be reached
             
         Returns:
             List of discovered tools
@@ -132,32 +383,78 @@ class MCPClient:
         
         server = self.servers[server_id]
         
-        async with aiohttp.ClientSession() as session:
-            headers = {}
-            if api_key:
-                headers["Authorization"] = f"Bearer {api_key}"
+        session = await self._get_session()
+        
+        headers = self._get_headers(api_key)
+        
+        try:
+            async with session.get(server.tools_url, headers=headers) as response:
+                if response.status != 200:
+                    raise ConnectionError(f"Failed to discover tools: {response.status} {await _err_body(response)}")
+                
+                data = orjson.loads(await response.read())
+                
+                # Validate the whole catalog in one call
+                raw_tools = data.get("tools", [])
+                for tool_data in raw_tools:
+                    tool_data["server_id"] = server_id
+                tools = _TOOL_LIST_ADAPTER.validate_python(raw_tools)
+                
+                # Update server's tool list and the tool index
+                self._unindex_tools(server_id)
+                self.servers[server_id] = server.model_copy(update={"tools": tools})
+                self._tool_index.update((tool.id, (server_id, tool)) for tool in tools)
+                self._save_cached_tools(server_id, tools)
+                
+                return tools
+        
+        except Exception as e:
+            cached_tools = self._load_cached_tools(server_id) if allow_cached else []
+            if not cached_tools:
+                raise ConnectionError(f"Failed to connect to MCP server: {str(e)}")
             
-            try:
-                async with session.get(f"{server.url}/tools", headers=headers) as response:
-                    if response.status != 200:
-                        raise ConnectionError(f"Failed to discover tools: {response.status} {await response.text()}")
-                    
-                    data = await response.json()
-                    tools = []
-                    
-                    for tool_data in data.get("tools", []):
-                        tool_data["server_id"] = server_id
-                        tool = MCPTool(**tool_data)
-                        tools.append(tool)
-                    
-                    # Update server's tool list
-                    server.tools = tools
-                    self.servers[server_id] = server
-                    
-                    return tools
+            logger.warning("Using cached tool catalog for unreachable MCP server %s: %s", server_id, e)
+            self._unindex_tools(server_id)
+            self.servers[server_id] = server.model_copy(update={"tools": cached_tools})
+            self._tool_index.update((tool.id, (server_id, tool)) for tool in cached_tools)
+            return cached_tools
+    
+    async def discover_all_tools(self, api_keys: Optional[Dict[str, str]] = None) -> Dict[str, List[MCPTool]]:
+        """
+        Discover tools on every registered MCP server concurrently.
+        
+        Args:
+            api_keys: Optional mapping of server IDs to API keys
             
-            except Exception as e:
-                raise ConnectionError(f"Failed to connect to MCP server: {str(e)}")
+        Returns:
+            Dictionary mapping server IDs to their discovered tools; servers that
+            couldn't be reached map to an empty list
+        """
+        api_keys = api_keys or {}
+        server_ids = list(self.servers)
+        
+        results = await asyncio.gather(
+            *(self._discover_tools_or_empty(server_id, api_keys.get(server_id)) for server_id in server_ids)
+        )
+        
+        return dict(zip(server_ids, results))
+    
+    async def _discover_tools_or_empty(self, server_id: str, api_key: Optional[str]) -> List[MCPTool]:
+        """
+        Discover tools on a server, returning an empty list if it can't be reached.
+        
+        Args:
+            server_id: ID of the server to discover tools from
+            api_key: Optional API key for authenticated discovery
+            
+        Returns:
+            List of discovered tools
+        """
+        try:
+            return await self.discover_tools(server_id, api_key)
+        except (ConnectionError, ValueError) as e:
+            logger.warning("Tool discovery failed for MCP server %s: %s", server_id, e)
+            return []
     
     async def execute_tool(
         self,
@@ -185,77 +482,102 @@ class MCPClient:
             ConnectionError: If connection to the server fails
         """
         # Find which server has this tool
-        server_id = None
-        tool = None
-        
-        for s_id, server in self.servers.items():
-            for t in server.tools:
-                if t.id == tool_id:
-                    server_id = s_id
-                    tool = t
-                    break
-            
-            if server_id:
-                break
-        
-        if not server_id or not tool:
+        entry = self._tool_index.get(tool_id)
+        if entry is None:
             raise ValueError(f"Unknown tool ID: {tool_id}")
         
+        server_id = entry[0]
         server = self.servers[server_id]
         
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Content-Type": "application/json",
-            }
+        session = await self._get_session()
+        
+        headers = self._get_headers(api_key)
+        
+        try:
+            # Execute the tool, releasing the connection back to the pool before any polling
+            async with session.post(
+                server.execute_url(tool_id),
+                headers=headers,
+                data=orjson.dumps({"parameters": parameters})
+            ) as response:
+                if response.status not in (200, 202):
+                    raise ConnectionError(f"Failed to execute tool: {response.status} {await _err_body(response)}")
+                
+                data = orjson.loads(await response.read())
             
-            if api_key:
-                headers["Authorization"] = f"Bearer {api_key}"
+            tool_response = _RESPONSE_ADAPTER.validate_python({"status": "error", **data, "tool_id": tool_id})
             
-            try:
-                # Execute the tool
-                async with session.post(
-                    f"{server.url}/tools/{tool_id}/execute",
-                    headers=headers,
-                    json={"parameters": parameters}
-                ) as response:
-                    if response.status not in (200, 202):
-                        raise ConnectionError(f"Failed to execute tool: {response.status} {await response.text()}")
-                    
-                    data = await response.json()
-                    tool_response = MCPToolResponse(
-                        tool_id=tool_id,
-                        status=data.get("status", "error"),
-                        execution_id=data.get("execution_id"),
-                        result=data.get("result"),
-                        error=data.get("error")
-                    )
-                    
-                    # If the tool execution is asynchronous and we should wait for completion
-                    if (
-                        tool_response.status == "in_progress" and
-                        tool_response.execution_id and
-                        wait_for_completion
-                    ):
-                        return await self._wait_for_completion(
-                            server.url,
-                            tool_id,
-                            tool_response.execution_id,
-                            headers,
-                            timeout
-                        )
-                    
-                    return tool_response
+            # Terminal statuses (success or error) come back as-is, as does anything we can't wait on
+            if (
+                tool_response.status != "in_progress" or
+                not wait_for_completion or
+                not tool_response.execution_id
+            ):
+                return tool_response
+            
+            # The tool runs asynchronously, so wait for it to complete
+            return await self._wait_for_completion(
+                server,
+                tool_id,
+                tool_response.execution_id,
+                headers,
+                timeout
+            )
+        
+        except Exception as e:
+            return MCPToolResponse(
+                tool_id=tool_id,
+                status="error",
+                error=f"Failed to connect to MCP server: {str(e)}"
+            )
+    
+    async def execute_tools_batch(
+        self,
+        calls: List[Tuple[str, Dict[str, Any]]],
+        api_keys: Optional[Dict[str, str]] = None,
+        wait_for_completion: bool = True,
+        timeout: float = 30.0
+    ) -> List[MCPToolResponse]:
+        """
+        Execute several tools concurrently, across one or more MCP servers.
+        
+        All calls share the client's pooled HTTP session.
+        
+        Args:
+            calls: List of (tool_id, parameters) pairs to execute
+            api_keys: Optional mapping of server IDs to API keys
+            wait_for_completion: Whether to wait for async tool completion
+            timeout: Timeout in seconds for waiting for completion
             
-            except Exception as e:
-                return MCPToolResponse(
-                    tool_id=tool_id,
-                    status="error",
-                    error=f"Failed to connect to MCP server: {str(e)}"
-                )
+        Returns:
+            The tool execution responses, in the same order as the calls; failed
+            calls are returned as error responses
+        """
+        api_keys = api_keys or {}
+        
+        coros = []
+        for tool_id, parameters in calls:
+            entry = self._tool_index.get(tool_id)
+            api_key = api_keys.get(entry[0]) if entry is not None else None
+            coros.append(self.execute_tool(
+                tool_id,
+                parameters,
+                api_key=api_key,
+                wait_for_completion=wait_for_completion,
+                timeout=timeout
+            ))
+        
+        results = await asyncio.gather(*coros, return_exceptions=True)
+        
+        return [
+            MCPToolResponse(tool_id=tool_id, status="error", error=str(result))
+            if isinstance(result, Exception) else result
+            for (tool_id, _), result in zip(calls, results)
+        ]
     
     async def _wait_for_completion(
         self,
-        server_url: str,
+        server: MCPServer,
         tool_id: str,
         execution_id: str,
         headers: Dict[str, str],
@@ -264,8 +586,11 @@ class MCPClient:
         """
         Wait for an asynchronous tool execution to complete.
         
+        The status is polled with exponential backoff, honoring any Retry-After
+        header from the server.
+        
         Args:
-            server_url: Base URL of the server
+            server: The server running the execution
             tool_id: ID of the tool
             execution_id: ID of the execution
             headers: HTTP headers to use for the request
@@ -274,36 +599,39 @@ class MCPClient:
         Returns:
             The tool execution response
         """
-        start_time = asyncio.get_event_loop().time()
-        
-        async with aiohttp.ClientSession() as session:
-            while asyncio.get_event_loop().time() - start_time < timeout:
-                async with session.get(
-                    f"{server_url}/tools/{tool_id}/executions/{execution_id}",
-                    headers=headers
-                ) as response:
-                    if response.status != 200:
-                        return MCPToolResponse(
-                            tool_id=tool_id,
-                            status="error",
-                            execution_id=execution_id,
-                            error=f"Failed to check execution status: {response.status} {await response.text()}"
-                        )
-                    
-                    data = await response.json()
-                    status = data.get("status")
-                    
-                    if status in ("success", "error"):
-                        return MCPToolResponse(
-                            tool_id=tool_id,
-                            status=status,
-                            execution_id=execution_id,
-                            result=data.get("result"),
-                            error=data.get("error")
-                        )
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        
+        session = await self._get_session()
+        status_url = server.status_url(tool_id, execution_id)
+        
+        delay = 0.05
+        
+        while loop.time() < deadline:
+            async with session.get(status_url, headers=headers) as response:
+                if response.status != 200:
+                    return MCPToolResponse(
+                        tool_id=tool_id,
+                        status="error",
+                        execution_id=execution_id,
+                        error=f"Failed to check execution status: {response.status} {await _err_body(response)}"
+                    )
+                
+                data = orjson.loads(await response.read())
+                status = data.get("status")
+                
+                if status in ("success", "error"):
+                    return _RESPONSE_ADAPTER.validate_python({**data, "tool_id": tool_id, "execution_id": execution_id})
                 
-                # Wait a bit before checking again
-                await asyncio.sleep(0.5)
+                retry_after = response.headers.get("Retry-After")
+            
+            # Wait before checking again, preferring the server's hint over our backoff
+            try:
+                wait = float(retry_after) if retry_after is not None else delay
+            except ValueError:
+                wait = delay
+            await asyncio.sleep(max(0.0, min(wait, deadline - loop.time())))
+            delay = min(1.0, delay * 1.5)
         
         # Timeout reached
         return MCPToolResponse(
@@ -11,6 +11,7 @@ from pydantic import BaseModel, Field
 
 from supabase import Client as SupabaseClient
 from .a2a_protocol import A2AProtocol
+from .mcp_client import MCPClient
 
 
 @dataclass
@@ -29,9 +30,37 @@ class AgentDependencies:
     # MCP servers configuration
     mcp_servers: Dict[str, Dict[str, Any]] = field(default_factory=dict)
     
+    # Long-lived MCP client, so discovered tools and pooled connections survive across tool calls
+    mcp_client: MCPClient = field(default_factory=MCPClient)
+    
     # Ollama configuration
     ollama_base_url: str = "http://localhost:11434"
     ollama_model: str = "llama3"
+    
+    # Masked view of mcp_servers for listing, built on first use
+    _masked_servers_cache: Optional[List[Dict[str, Any]]] = field(default=None, init=False, repr=False)
+    
+    def masked_mcp_servers(self) -> List[Dict[str, Any]]:
+        """
+        Get the configured MCP servers with their API keys masked.
+        
+        Returns:
+            List of MCP server configurations including their IDs
+        """
+        if self._masked_servers_cache is None:
+            self._masked_servers_cache = [
+                {
+                    **server_config,
+                    **({"api_key": "********"} if "api_key" in server_config else {}),
+                    "id": server_id
+                }
+                for server_id, server_config in self.mcp_servers.items()
+            ]
+        return self._masked_servers_cache
+    
+    def invalidate_mcp_servers(self) -> None:
+        """Drop the masked server view after mcp_servers changes."""
+        self._masked_servers_cache = None
 
 
 class ToolParameter(BaseModel):
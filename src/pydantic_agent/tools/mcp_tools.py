@@ -11,7 +11,6 @@ import asyncio
 
 from pydantic_ai import RunContext
 from ..models import AgentDependencies
-from ..mcp_client import MCPClient
 
 
 async def discover_mcp_tools(
@@ -28,7 +27,7 @@ async def discover_mcp_tools(
     Returns:
         List of discovered tools with their details
     """
-    mcp_client = MCPClient()
+    mcp_client = context.deps.mcp_client
     
     # Get API key for the server if available
     api_key = None
@@ -54,6 +53,43 @@ async def discover_mcp_tools(
         return [{"error": str(e)}]
 
 
+async def discover_all_mcp_tools(context: RunContext[AgentDependencies]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Discover tools available on all configured MCP servers at once.
+    
+    Args:
+        context: The run context containing dependencies
+        
+    Returns:
+        Dictionary mapping server IDs to their discovered tools
+    """
+    mcp_client = context.deps.mcp_client
+    
+    # Get API keys for the servers if available
+    api_keys = {
+        server_id: server_config["api_key"]
+        for server_id, server_config in context.deps.mcp_servers.items()
+        if server_config.get("api_key")
+    }
+    
+    # Discover tools on every server concurrently
+    tools_by_server = await mcp_client.discover_all_tools(api_keys)
+    
+    # Convert to simple dictionaries for the LLM
+    return {
+        server_id: [
+            {
+                "id": tool.id,
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.parameters
+            }
+            for tool in tools
+        ]
+        for server_id, tools in tools_by_server.items()
+    }
+
+
 async def call_mcp_tool(
     context: RunContext[AgentDependencies],
     server_id: str,
@@ -72,7 +108,7 @@ async def call_mcp_tool(
     Returns:
         The result of the tool execution
     """
-    mcp_client = MCPClient()
+    mcp_client = context.deps.mcp_client
     
     # Get API key for the server if available
     api_key = None
@@ -108,23 +144,14 @@ async def list_mcp_servers(context: RunContext[AgentDependencies]) -> List[Dict[
     Returns:
         List of MCP servers with their details
     """
-    servers = []
-    
-    for server_id, server_config in context.deps.mcp_servers.items():
-        # Don't include API keys in the output
-        server_info = server_config.copy()
-        if "api_key" in server_info:
-            server_info["api_key"] = "********"  # Mask the API key
-        
-        server_info["id"] = server_id
-        servers.append(server_info)
-    
-    return servers
+    # Don't include API keys in the output; the masked view is built once per server change
+    return context.deps.masked_mcp_servers()
 
 
 # Register tools in the registry
 from ..tools import TOOL_REGISTRY
 
 TOOL_REGISTRY["discover_mcp_tools"] = discover_mcp_tools
+TOOL_REGISTRY["discover_all_mcp_tools"] = discover_all_mcp_tools
 TOOL_REGISTRY["call_mcp_tool"] = call_mcp_tool
 TOOL_REGISTRY["list_mcp_servers"] = list_mcp_servers
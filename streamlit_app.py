@@ -7,6 +7,7 @@ import asyncio
 import streamlit as st
 import requests
 from generic_agent import run_generic_agent
+from agent_core import get_background_loop
 from a2a_protocol import A2AProtocol, AgentInfo
 import dotenv
 
@@ -59,6 +60,34 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# HTTP session shared across reruns so model lookups reuse the connection
+@st.cache_resource
+def get_http_session():
+    return requests.Session()
+
+# Models offered when Ollama can't be reached or reports none
+FALLBACK_OLLAMA_MODELS = ["llama2", "codellama", "mistral", "gemma", "deepseek"]
+
+# Fetch available Ollama models, refreshed at most once a minute rather than on every rerun.
+# Failures raise so that they aren't cached and the next rerun tries again.
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_ollama_models():
+    ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    response = get_http_session().get(f"{ollama_base_url}/api/tags", timeout=2.0)
+    if response.status_code != 200:
+        raise RuntimeError(f"Could not fetch Ollama models. Status code: {response.status_code}")
+    # Extract model names
+    return [model["name"] for model in response.json().get("models", [])]
+
+# Get available Ollama models, falling back to a default list
+def get_ollama_models():
+    try:
+        models = fetch_ollama_models()
+    except Exception as e:
+        st.warning(f"Error fetching Ollama models: {str(e)}")
+        return list(FALLBACK_OLLAMA_MODELS)
+    return models or list(FALLBACK_OLLAMA_MODELS)
+
 # Title
 st.title("Generic Agent Interface")
 st.subheader("Interact with a versatile agent powered by Supabase, Ollama, and A2A protocol")
@@ -67,26 +96,6 @@ st.subheader("Interact with a versatile agent powered by Supabase, Ollama, and A
 with st.sidebar:
     st.header("Configuration")
     
-    # Get available Ollama models
-    def get_ollama_models():
-        try:
-            ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-            response = requests.get(f"{ollama_base_url}/api/tags")
-            if response.status_code == 200:
-                models_data = response.json().get("models", [])
-                # Extract model names
-                models = [model["name"] for model in models_data]
-                # Add fallback models in case the API is unavailable
-                if not models:
-                    return ["llama2", "codellama", "mistral", "gemma", "deepseek"]
-                return models
-            else:
-                st.warning(f"Could not fetch Ollama models. Status code: {response.status_code}")
-                return ["llama2", "codellama", "mistral", "gemma", "deepseek"]
-        except Exception as e:
-            st.warning(f"Error fetching Ollama models: {str(e)}")
-            return ["llama2", "codellama", "mistral", "gemma", "deepseek"]
-
     # Model selection
     available_models = get_ollama_models()
     model = st.selectbox(
@@ -125,13 +134,14 @@ if prompt:
         message_placeholder.markdown("🤔 Thinking...")
         
         try:
-            # Call the generic agent
+            # Call the generic agent on the shared background loop, so its
+            # clients and connection pools survive between messages
             with st.spinner("Processing..."):
-                response = asyncio.run(run_generic_agent(
+                response = asyncio.run_coroutine_threadsafe(run_generic_agent(
                     prompt,
                     table_name=table_name,
                     model=model
-                ))
+                ), get_background_loop()).result()
             
             # Update placeholder with response
             message_placeholder.markdown(response)
@@ -0,0 +1,9 @@
+"""Shared pytest configuration."""
+
+import os
+import sys
+
+# Make the root modules and the src/ package importable without installing
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "src"))
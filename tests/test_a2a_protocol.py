@@ -0,0 +1,107 @@
+"""Tests for the pydantic A2A protocol."""
+
+import asyncio
+
+from pydantic_agent.a2a_protocol import A2AProtocol, Message
+
+
+async def _protocol_with(*agent_ids):
+    protocol = A2AProtocol()
+    for agent_id in agent_ids:
+        await protocol.register_agent({"id": agent_id, "name": agent_id})
+    return protocol
+
+
+def test_receive_with_zero_timeout_returns_queued_messages():
+    async def scenario():
+        protocol = await _protocol_with("a", "b")
+        await protocol.send_message(Message(sender_id="a", recipient_id="b", content="one"))
+        await protocol.send_message(Message(sender_id="a", recipient_id="b", content="two"))
+        return await protocol.receive_messages("b", timeout=0)
+    
+    messages = asyncio.run(scenario())
+    assert [message["content"] for message in messages] == ["one", "two"]
+
+
+def test_receive_times_out_on_empty_inbox():
+    async def scenario():
+        protocol = await _protocol_with("a")
+        return await protocol.receive_messages("a", timeout=0.01)
+    
+    assert asyncio.run(scenario()) == []
+
+
+def test_receive_wakes_up_for_a_late_message():
+    async def scenario():
+        protocol = await _protocol_with("a", "b")
+        
+        async def send_later():
+            await asyncio.sleep(0.01)
+            await protocol.send_message({"sender_id": "a", "recipient_id": "b", "content": "late"})
+        
+        sender = asyncio.ensure_future(send_later())
+        messages = await protocol.receive_messages("b", timeout=1.0)
+        await sender
+        return messages
+    
+    messages = asyncio.run(scenario())
+    assert [message["content"] for message in messages] == ["late"]
+
+
+def test_receive_for_unknown_agent_returns_empty_list():
+    async def scenario():
+        protocol = await _protocol_with("a")
+        return await protocol.receive_messages("missing", timeout=0)
+    
+    assert asyncio.run(scenario()) == []
+
+
+def test_history_is_visible_right_after_send():
+    async def scenario():
+        protocol = await _protocol_with("a", "b")
+        result = await protocol.send_message(Message(sender_id="a", recipient_id="b", content="hello\nworld"))
+        return protocol, result["thread_id"]
+    
+    protocol, thread_id = asyncio.run(scenario())
+    history = protocol.get_thread_history(thread_id)
+    assert [message["content"] for message in history] == ["hello\nworld"]
+    
+    threads = protocol.get_all_threads()
+    assert len(threads) == 1
+    assert threads[0].title == "hello"
+    assert threads[0].message_count == 1
+
+
+def test_concurrent_sends_share_one_thread_summary():
+    async def scenario():
+        protocol = await _protocol_with("a", "b", "c")
+        await asyncio.gather(*(
+            protocol.send_message({
+                "sender_id": sender,
+                "recipient_id": "b",
+                "content": f"message {i}",
+                "thread_id": "thread-1",
+            })
+            for i, sender in enumerate(["a", "c"] * 5)
+        ))
+        return protocol
+    
+    protocol = asyncio.run(scenario())
+    summary, = protocol.get_all_threads()
+    assert summary.message_count == 10
+    assert sorted(summary.participants) == ["a", "b", "c"]
+    assert len(protocol.get_thread_history("thread-1")) == 10
+
+
+def test_history_is_capped_per_thread():
+    async def scenario():
+        protocol = A2AProtocol(history_cap=3)
+        for agent_id in ("a", "b"):
+            await protocol.register_agent({"id": agent_id, "name": agent_id})
+        for i in range(5):
+            await protocol.send_message({"sender_id": "a", "recipient_id": "b", "content": str(i), "thread_id": "t"})
+        return protocol
+    
+    protocol = asyncio.run(scenario())
+    assert [message["content"] for message in protocol.get_thread_history("t")] == ["2", "3", "4"]
+    assert protocol.get_all_threads()[0].message_count == 5
@@ -0,0 +1,118 @@
+"""Tests for PydanticAgent's A2A registration lifecycle."""
+
+import asyncio
+
+import pytest
+from pydantic_ai.models.test import TestModel
+
+import pydantic_agent.agent as agent_module
+from pydantic_agent.a2a_protocol import A2AProtocol
+
+
+@pytest.fixture
+def make_agent(monkeypatch):
+    # Swap the Ollama model for pydantic-ai's offline test model
+    real_agent = agent_module.Agent
+    monkeypatch.setattr(agent_module, "Agent", lambda model, **kwargs: real_agent(TestModel(), **kwargs))
+    for name in list(agent_module.os.environ):
+        if name.startswith("MCP_SERVER_"):
+            monkeypatch.delenv(name)
+    
+    def make(**kwargs):
+        return agent_module.PydanticAgent(agent_id="agent-1", agent_name="Agent One", **kwargs)
+    
+    return make
+
+
+def test_default_protocol_is_per_event_loop(make_agent):
+    agent = make_agent()
+    
+    async def run_once():
+        await agent.start()
+        protocol = agent.a2a_protocol
+        assert "agent-1" in protocol.agents
+        
+        # Queues created on this loop must be usable here
+        assert await protocol.receive_messages("agent-1", timeout=0) == []
+        return protocol
+    
+    first = asyncio.run(run_once())
+    second = asyncio.run(run_once())
+    assert first is not second
+
+
+def test_close_leaves_a_registration_made_by_someone_else(make_agent):
+    protocol = A2AProtocol()
+    agent = make_agent(a2a_protocol=protocol)
+    
+    async def scenario():
+        await protocol.register_agent({"id": "agent-1", "name": "Agent One"})
+        await agent.start()
+        assert agent._registered_protocol is protocol
+        
+        await agent.close()
+        return "agent-1" in protocol.agents
+    
+    assert asyncio.run(scenario()) is True
+
+
+def test_close_removes_its_own_registration(make_agent):
+    protocol = A2AProtocol()
+    agent = make_agent(a2a_protocol=protocol)
+    
+    async def scenario():
+        await agent.start()
+        await agent.close()
+        return "agent-1" in protocol.agents
+    
+    assert asyncio.run(scenario()) is False
+
+
+def test_start_registers_once_on_an_injected_protocol(make_agent):
+    protocol = A2AProtocol()
+    agent = make_agent(a2a_protocol=protocol)
+    
+    async def scenario():
+        await agent.start()
+        registered_at = protocol.agent_runtime["agent-1"]["registered_at"]
+        await agent.start()
+        return registered_at == protocol.agent_runtime["agent-1"]["registered_at"]
+    
+    assert asyncio.run(scenario())
+
+
+def test_mcp_servers_are_loaded_from_sparse_unordered_env(make_agent, monkeypatch):
+    for key, value in {
+        "MCP_SERVER_7_URL": "http://seven.test",
+        "MCP_SERVER_2_API_KEY": "secret",
+        "MCP_SERVER_7_NAME": "Seven",
+        "MCP_SERVER_2_NAME": "Two",
+        "MCP_SERVER_2_URL": "http://two.test",
+        "MCP_SERVER_4_NAME": "No URL",
+        "MCP_SERVER_12_URL": "http://no-name.test",
+        "MCP_SERVER_9_NAME": "Two",
+        "MCP_SERVER_9_URL": "http://two.test",
+        "MCP_SERVER_10_NAME": "Seven",
+        "MCP_SERVER_10_URL": "http://seven-b.test",
+    }.items():
+        monkeypatch.setenv(key, value)
+    
+    agent = make_agent()
+    
+    assert [(config["name"], config["url"]) for config in agent._load_mcp_servers_from_env()] == [
+        ("Two", "http://two.test"),
+        ("Seven", "http://seven.test"),
+        ("Two", "http://two.test"),
+        ("Seven", "http://seven-b.test"),
+    ]
+    assert agent._load_mcp_servers_from_env()[0]["api_key"] == "secret"
+    
+    # The duplicate (name, url) pair from server 9 is registered only once
+    assert sorted((config["name"], config["url"]) for config in agent.mcp_server_configs.values()) == [
+        ("Seven", "http://seven-b.test"),
+        ("Seven", "http://seven.test"),
+        ("Two", "http://two.test"),
+    ]
+    assert len(agent.mcp_client.servers) == 3
+    assert agent._add_mcp_server({"name": "Two", "url": "http://two.test"}) in agent.mcp_server_configs
+    assert len(agent.mcp_client.servers) == 3
@@ -0,0 +1,40 @@
+"""Tests for the simplified agent core's shared clients and background loop."""
+
+import asyncio
+
+import agent_core
+
+
+def test_shutdown_closes_background_loop_clients():
+    loop = agent_core.get_background_loop()
+    
+    async def get_client():
+        return agent_core.get_async_client("http://ollama.test:11434")
+    
+    client = asyncio.run_coroutine_threadsafe(get_client(), loop).result(5)
+    assert not client._client.is_closed
+    
+    agent_core.shutdown_background_loop()
+    
+    assert client._client.is_closed
+    assert loop.is_closed()
+    assert agent_core.get_background_loop() is not loop
+    agent_core.shutdown_background_loop()
+
+
+def test_shutdown_without_a_background_loop_is_a_no_op():
+    agent_core.shutdown_background_loop()
+    agent_core.shutdown_background_loop()
+
+
+def test_changing_the_system_prompt_updates_the_messages():
+    agent = agent_core.Agent(system_prompt="Be brief.")
+    assert agent._build_messages("hi")[0]["content"] == "Be brief."
+    
+    agent.system_prompt = "Be thorough."
+    
+    assert agent.system_prompt == "Be thorough."
+    assert list(map(dict, agent._build_messages("hi"))) == [
+        {"role": "system", "content": "Be thorough."},
+        {"role": "user", "content": "hi"},
+    ]
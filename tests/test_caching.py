@@ -0,0 +1,131 @@
+"""Tests for the query cache and the embedding caches."""
+
+import pytest
+
+import caching
+
+
+def results_for(text):
+    return {"documents": [[text]], "metadatas": [[{}]], "distances": [[0.1]], "ids": [["1"]]}
+
+
+def test_query_cache_serves_exact_and_similar_queries():
+    cache = caching.QueryCache()
+    cache.put("docs", "cats", 5, None, results_for("cats"), query_embedding=[1.0, 0.0])
+    
+    assert cache.get("docs", "cats", 5) == results_for("cats")
+    assert cache.get("docs", "kittens", 5, query_embedding=[0.99, 0.05]) == results_for("cats")
+    assert cache.get("docs", "dogs", 5, query_embedding=[0.0, 1.0]) is None
+    assert cache.get("docs", "cats", 3) is None
+    assert cache.get("docs", "cats", 5, filters={"lang": "en"}) is None
+
+
+def test_query_cache_returns_copies():
+    cache = caching.QueryCache()
+    results = results_for("cats")
+    cache.put("docs", "cats", 5, None, results)
+    
+    results["documents"][0].append("stored")
+    cache.get("docs", "cats", 5)["documents"][0].append("returned")
+    
+    assert cache.get("docs", "cats", 5) == results_for("cats")
+
+
+def test_query_cache_evicts_least_recently_used():
+    cache = caching.QueryCache(cache_size=2)
+    cache.put("docs", "a", 5, None, results_for("a"), query_embedding=[1.0, 0.0])
+    cache.put("docs", "b", 5, None, results_for("b"))
+    cache.get("docs", "a", 5)
+    cache.put("docs", "c", 5, None, results_for("c"))
+    
+    assert cache.get("docs", "b", 5) is None
+    assert cache.get("docs", "a", 5) == results_for("a")
+    assert cache.get("docs", "c", 5) == results_for("c")
+
+
+def test_query_cache_entries_expire():
+    cache = caching.QueryCache(ttl=0)
+    cache.put("docs", "cats", 5, None, results_for("cats"), query_embedding=[1.0, 0.0])
+    
+    assert cache.get("docs", "cats", 5) is None
+    assert cache.get("docs", "kittens", 5, query_embedding=[1.0, 0.0]) is None
+
+
+def test_query_cache_invalidation_is_per_table():
+    cache = caching.QueryCache()
+    cache.put("docs", "cats", 5, None, results_for("cats"), query_embedding=[1.0, 0.0])
+    cache.put("notes", "cats", 5, None, results_for("notes"))
+    
+    cache.invalidate("docs")
+    assert cache.get("docs", "cats", 5) is None
+    assert cache.get("docs", "kittens", 5, query_embedding=[1.0, 0.0]) is None
+    assert cache.get("notes", "cats", 5) == results_for("notes")
+    
+    cache.invalidate()
+    assert cache.get("notes", "cats", 5) is None
+
+
+
+def test_embedding_store_round_trips_across_reopen(tmp_path):
+    store = caching.EmbeddingStore(3, str(tmp_path), capacity=4)
+    store.put_many({b"a": [1.0, 2.0, 3.0], b"b": [4.0, 5.0, 6.0]})
+    store.close()
+    
+    store = caching.EmbeddingStore(3, str(tmp_path), capacity=8)
+    try:
+        assert store.get_many([b"a", b"b", b"missing"]) == {b"a": [1.0, 2.0, 3.0], b"b": [4.0, 5.0, 6.0]}
+        
+        # Keys already stored keep their first vector
+        store.put_many({b"a": [0.0, 0.0, 0.0], b"c": [7.0, 8.0, 9.0]})
+        assert store.get_many([b"a", b"c"]) == {b"a": [1.0, 2.0, 3.0], b"c": [7.0, 8.0, 9.0]}
+    finally:
+        store.close()
+
+
+def test_embedding_store_stops_at_capacity(tmp_path):
+    store = caching.EmbeddingStore(2, str(tmp_path), capacity=2)
+    try:
+        store.put_many({b"a": [1.0, 0.0], b"b": [0.0, 1.0], b"c": [1.0, 1.0]})
+        assert sorted(store.get_many([b"a", b"b", b"c"])) == [b"a", b"b"]
+    finally:
+        store.close()
+
+
+def test_embedding_store_rejects_a_capacity_below_its_contents(tmp_path):
+    caching.EmbeddingStore(2, str(tmp_path), capacity=4).close()
+    
+    with pytest.raises(ValueError, match="too small"):
+        caching.EmbeddingStore(2, str(tmp_path), capacity=2)
+
+
+def test_embedding_store_rejects_a_truncated_vector_file(tmp_path):
+    store = caching.EmbeddingStore(2, str(tmp_path), capacity=4)
+    store.put_many({b"a": [1.0, 0.0], b"b": [0.0, 1.0]})
+    store.close()
+    
+    with open(tmp_path / "embeddings-2.f32", "r+b") as f:
+        f.truncate(8)
+    
+    with pytest.raises(ValueError, match="index refers to 2"):
+        caching.EmbeddingStore(2, str(tmp_path), capacity=4)
+
+
+def test_cached_embedder_embeds_each_text_once(tmp_path):
+    calls = []
+    
+    def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+    
+    store = caching.EmbeddingStore(2, str(tmp_path), capacity=8)
+    try:
+        embedder = caching.CachedEmbedder(embed, store=store)
+        assert embedder(["a", "bb", "a"]) == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+        assert embedder(["bb"]) == [[2.0, 1.0]]
+        
+        # A fresh embedder finds the vectors in the store
+        assert caching.CachedEmbedder(embed, store=store)(["a", "ccc"]) == [[1.0, 1.0], [3.0, 1.0]]
+    finally:
+        store.close()
+    
+    assert calls == [["a", "bb"], ["ccc"]]
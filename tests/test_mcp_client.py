@@ -0,0 +1,196 @@
+"""Tests for the MCP client against a local aiohttp server."""
+
+import asyncio
+import gc
+import warnings
+
+from aiohttp import web
+
+from pydantic_agent.mcp_client import MCPClient, MCPServer
+
+
+TOOLS = [
+    {"id": "echo", "name": "Echo", "description": "Echo the parameters", "version": "1"},
+    {"id": "slow", "name": "Slow", "description": "Finish after a few polls", "version": "1"},
+]
+
+
+async def start_server(polls_before_done=2, retry_after=None):
+    """Start an MCP server on a free port and return (runner, url, stats)."""
+    stats = {"polls": 0, "executions": 0}
+    
+    async def list_tools(request):
+        return web.json_response({"tools": TOOLS})
+    
+    async def execute(request):
+        stats["executions"] += 1
+        body = await request.json()
+        if request.match_info["tool_id"] == "slow":
+            return web.json_response({"status": "in_progress", "execution_id": "exec-1"}, status=202)
+        return web.json_response({"status": "success", "result": body["parameters"]})
+    
+    async def status(request):
+        stats["polls"] += 1
+        if stats["polls"] <= polls_before_done:
+            headers = {"Retry-After": retry_after} if retry_after is not None else None
+            return web.json_response({"status": "in_progress"}, headers=headers)
+        return web.json_response({"status": "success", "result": "done"})
+    
+    app = web.Application()
+    app.router.add_get("/tools", list_tools)
+    app.router.add_post("/tools/{tool_id}/execute", execute)
+    app.router.add_get("/tools/{tool_id}/executions/{execution_id}", status)
+    
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", stats
+
+
+def test_sessions_are_closed_when_their_event_loop_shuts_down():
+    client = MCPClient()
+    
+    async def discover():
+        runner, url, _ = await start_server()
+        try:
+            server_id = client.add_server({"id": "local", "url": url})
+            return await client.discover_tools(server_id)
+        finally:
+            await runner.cleanup()
+    
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assert len(asyncio.run(discover())) == 2
+        assert len(asyncio.run(discover())) == 2
+        asyncio.run(client.aclose())
+        gc.collect()
+    
+    assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
+
+
+def test_tool_cache_is_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert MCPClient().tool_cache_dir is None
+
+
+def test_cached_tools_are_only_served_after_failed_discovery_when_allowed(tmp_path):
+    async def discover_then_stop():
+        client = MCPClient(tool_cache_dir=str(tmp_path))
+        runner, url, _ = await start_server()
+        try:
+            client.add_server({"id": "local", "url": url})
+            await client.discover_tools("local")
+        finally:
+            await runner.cleanup()
+            await client.aclose()
+        return url
+    
+    url = asyncio.run(discover_then_stop())
+    assert [p.name for p in tmp_path.iterdir()] == ["local.json"]
+    
+    async def reconnect():
+        client = MCPClient(tool_cache_dir=str(tmp_path))
+        try:
+            client.add_server({"id": "local", "url": url})
+            assert client.servers["local"].tools == []
+            assert "echo" not in client._tool_index
+            
+            try:
+                await client.discover_tools("local")
+            except ConnectionError:
+                pass
+            else:
+                raise AssertionError("discovery against a stopped server should fail")
+            
+            tools = await client.discover_tools("local", allow_cached=True)
+            return [tool.id for tool in tools], "echo" in client._tool_index
+        finally:
+            await client.aclose()
+    
+    tool_ids, echo = asyncio.run(reconnect())
+    assert tool_ids == ["echo", "slow"]
+    assert echo
+
+
+def test_server_builds_its_endpoint_urls():
+    server = MCPServer(id="local", name="Local", url="http://mcp.test")
+    
+    assert server.tools_url == "http://mcp.test/tools"
+    assert server.execute_url("echo") == "http://mcp.test/tools/echo/execute"
+    assert server.execute_url("echo") is server.execute_url("echo")
+    assert server.status_url("echo", "exec-1") == "http://mcp.test/tools/echo/executions/exec-1"
+
+
+def run_with_server(scenario, **server_options):
+    """Run scenario(client, stats) against a fresh server with discovered tools."""
+    async def main():
+        runner, url, stats = await start_server(**server_options)
+        try:
+            async with MCPClient() as client:
+                client.add_server({"id": "local", "url": url})
+                await client.discover_tools("local")
+                return await scenario(client, stats)
+        finally:
+            await runner.cleanup()
+    
+    return asyncio.run(main())
+
+
+def test_in_progress_executions_are_polled_until_done():
+    async def scenario(client, stats):
+        response = await client.execute_tool("slow", {})
+        return response, stats["polls"]
+    
+    response, polls = run_with_server(scenario, polls_before_done=2)
+    
+    assert (response.status, response.result, response.execution_id) == ("success", "done", "exec-1")
+    assert polls == 3
+
+
+def test_polling_honours_retry_after():
+    async def scenario(client, stats):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        response = await client.execute_tool("slow", {})
+        return response, loop.time() - started
+    
+    response, elapsed = run_with_server(scenario, polls_before_done=2, retry_after="0.3")
+    
+    assert response.status == "success"
+    assert elapsed >= 0.6
+
+
+def test_polling_gives_up_at_the_timeout():
+    async def scenario(client, stats):
+        return await client.execute_tool("slow", {}, timeout=0.2)
+    
+    response = run_with_server(scenario, polls_before_done=1000)
+    
+    assert (response.status, response.error, response.execution_id) == ("error", "Execution timed out", "exec-1")
+
+
+def test_execution_can_return_without_waiting():
+    async def scenario(client, stats):
+        return await client.execute_tool("slow", {}, wait_for_completion=False), stats["polls"]
+    
+    response, polls = run_with_server(scenario)
+    
+    assert (response.status, response.execution_id, polls) == ("in_progress", "exec-1", 0)
+
+
+def test_batch_execution_keeps_call_order():
+    async def scenario(client, stats):
+        return await client.execute_tools_batch([
+            ("slow", {}),
+            ("echo", {"text": "hi"}),
+            ("missing", {}),
+        ]), stats["executions"]
+    
+    responses, executions = run_with_server(scenario)
+    
+    assert [(r.tool_id, r.status) for r in responses] == [("slow", "success"), ("echo", "success"), ("missing", "error")]
+    assert responses[1].result == {"text": "hi"}
+    assert "Unknown tool ID" in responses[2].error
+    assert executions == 2
@@ -0,0 +1,184 @@
+"""Tests for the ring-buffer A2A protocol in the root a2a_protocol module."""
+
+import asyncio
+
+import pytest
+
+from a2a_protocol import A2AProtocol, AgentInfo, Message, RingBuffer
+
+
+async def _protocol_with(*agent_ids, inbox_capacity=1024):
+    protocol = A2AProtocol(inbox_capacity=inbox_capacity)
+    for agent_id in agent_ids:
+        await protocol.register_agent(AgentInfo(id=agent_id, name=agent_id, capabilities=[]))
+    return protocol
+
+
+def test_ring_buffer_requires_a_power_of_two_capacity():
+    with pytest.raises(ValueError):
+        RingBuffer(3)
+    with pytest.raises(ValueError):
+        RingBuffer(0)
+
+
+def test_ring_buffer_rejects_pushes_when_full():
+    buffer = RingBuffer(2)
+    
+    assert buffer.push(1) and buffer.push(2)
+    assert not buffer.push(3)
+    assert len(buffer) == 2
+    assert buffer.drain() == [1, 2]
+
+
+def test_ring_buffer_drains_across_the_wrap_around():
+    buffer = RingBuffer(4)
+    for item in range(3):
+        buffer.push(item)
+    assert buffer.drain(2) == [0, 1]
+    
+    # Sequences 3..5 occupy slots 3, 0 and 1
+    for item in range(3, 6):
+        assert buffer.push(item)
+    assert len(buffer) == 4
+    assert buffer.drain() == [2, 3, 4, 5]
+    assert buffer.buf == [None] * 4
+    assert buffer.drain() == []
+
+
+def test_ring_buffer_drain_respects_max_items():
+    buffer = RingBuffer(8)
+    for item in range(5):
+        buffer.push(item)
+    
+    assert buffer.drain(0) == []
+    assert buffer.drain(3) == [0, 1, 2]
+    assert buffer.drain(10) == [3, 4]
+
+
+def test_receive_batches_keeps_the_event_set_after_a_partial_drain():
+    async def scenario():
+        protocol = await _protocol_with("a", "b")
+        for content in ("one", "two", "three"):
+            await protocol.send_message(Message(sender_id="a", recipient_id="b", content=content))
+        
+        first = await protocol.receive_batches("b", max_batch=2, timeout=0)
+        still_set = protocol.inbox_events["b"].is_set()
+        second = await protocol.receive_batches("b", max_batch=2, timeout=0)
+        cleared = not protocol.inbox_events["b"].is_set()
+        return first, still_set, second, cleared
+    
+    first, still_set, second, cleared = asyncio.run(scenario())
+    assert [message["content"] for message in first] == ["one", "two"]
+    assert still_set
+    assert [message["content"] for message in second] == ["three"]
+    assert cleared
+
+
+def test_receive_batches_times_out_on_an_empty_inbox():
+    async def scenario():
+        protocol = await _protocol_with("a")
+        return await protocol.receive_batches("a", timeout=0.01), await protocol.receive_batches("missing")
+    
+    assert asyncio.run(scenario()) == ([], [])
+
+
+def test_receive_batches_wakes_up_for_a_late_message():
+    async def scenario():
+        protocol = await _protocol_with("a", "b")
+        
+        async def send_later():
+            await asyncio.sleep(0.01)
+            await protocol.send_message(Message(sender_id="a", recipient_id="b", content="late"))
+        
+        sender = asyncio.ensure_future(send_later())
+        messages = await protocol.receive_batches("b", timeout=1.0)
+        await sender
+        return messages
+    
+    assert [message["content"] for message in asyncio.run(scenario())] == ["late"]
+
+
+def test_direct_message_to_a_full_inbox_is_an_error():
+    async def scenario():
+        protocol = await _protocol_with("a", "b", inbox_capacity=1)
+        await protocol.send_message(Message(sender_id="a", recipient_id="b", content="one"))
+        return await protocol.send_message(Message(sender_id="a", recipient_id="b", content="two"))
+    
+    result = asyncio.run(scenario())
+    assert result["status"] == "error"
+    assert "full" in result["error"]
+
+
+def test_broadcasts_dropped_on_full_inboxes_are_counted(caplog):
+    async def scenario():
+        protocol = await _protocol_with("a", "b", "c", inbox_capacity=1)
+        await protocol.send_message(Message(sender_id="a", recipient_id="b", content="direct"))
+        result = await protocol.send_message(Message(sender_id="a", recipient_id="broadcast", content="all"))
+        return protocol, result, await protocol.receive_messages("c", timeout=0)
+    
+    with caplog.at_level("WARNING", logger="a2a_protocol"):
+        protocol, result, received = asyncio.run(scenario())
+    
+    assert result["status"] == "success"
+    assert [message["content"] for message in received] == ["all"]
+    assert protocol.get_dropped_counts() == {"b": 1}
+    assert "Inbox of agent b is full" in caplog.text
+
+
+def test_thread_history_returns_each_thread_in_send_order():
+    async def scenario():
+        protocol = await _protocol_with("a", "b")
+        first = Message(sender_id="a", recipient_id="b", content="question")
+        await protocol.send_message(first)
+        await protocol.send_message(Message(sender_id="b", recipient_id="a", content="other"))
+        await protocol.send_message(Message(sender_id="b", recipient_id="a", content="answer", thread_id=first.thread_id))
+        await protocol.send_message(Message(sender_id="a", recipient_id="broadcast", content="thanks", thread_id=first.thread_id))
+        return protocol, first.thread_id
+    
+    protocol, thread_id = asyncio.run(scenario())
+    
+    assert [message["content"] for message in protocol.get_thread_history(thread_id)] == ["question", "answer", "thanks"]
+    assert protocol.get_thread_history("missing") == []
+    assert [message["content"] for message in protocol.get_recent_messages(2)] == ["answer", "thanks"]
+    assert protocol.get_recent_messages(0) == []
+
+
+def test_failed_sends_are_not_logged():
+    async def scenario():
+        protocol = await _protocol_with("a")
+        message = Message(sender_id="a", recipient_id="missing", content="lost")
+        await protocol.send_message(message)
+        return protocol, message.thread_id
+    
+    protocol, thread_id = asyncio.run(scenario())
+    
+    assert protocol.message_log == []
+    assert protocol.get_thread_history(thread_id) == []
+
+
+def test_capability_index_follows_registration():
+    async def scenario():
+        protocol = A2AProtocol()
+        await protocol.register_agent(AgentInfo(id="a", name="a", capabilities=["search", "math"]))
+        await protocol.register_agent(AgentInfo(id="b", name="b", capabilities=["search"]))
+        
+        # A second registration under the same ID leaves the index untouched
+        await protocol.register_agent(AgentInfo(id="a", name="a", capabilities=["chat"]))
+        before = {capability: set(ids) for capability, ids in protocol.capability_index.items()}
+        
+        await protocol.unregister_agent("a")
+        after_a = {capability: set(ids) for capability, ids in protocol.capability_index.items()}
+        searchers = [agent["id"] for agent in protocol.get_agents_with_capability("search")]
+        
+        await protocol.unregister_agent("b")
+        await protocol.unregister_agent("b")
+        return before, after_a, searchers, protocol
+    
+    before, after_a, searchers, protocol = asyncio.run(scenario())
+    
+    assert before == {"search": {"a", "b"}, "math": {"a"}}
+    assert after_a == {"search": {"b"}}
+    assert searchers == ["b"]
+    assert dict(protocol.capability_index) == {}
+    assert protocol.get_agents_with_capability("search") == []
+    assert protocol.get_agents_with_capability("chat") == []
@@ -0,0 +1,109 @@
+"""Tests for the SearXNG MCP API's execution store and long-poll status endpoint."""
+
+import asyncio
+import importlib.util
+import os
+import time
+
+import pytest
+from cachetools import TTLCache
+from fastapi.testclient import TestClient
+
+# The API lives in a deployment directory rather than a package, so load it by path
+_spec = importlib.util.spec_from_file_location(
+    "searxng_mcp_api",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp", "searxng", "mcp_api.py")
+)
+mcp_api = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(mcp_api)
+
+STATUS_URL = "/tools/searxng_search/executions/{}"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A test client that skips launching SearXNG and never runs a real search."""
+    monkeypatch.setattr(mcp_api.app.router, "on_startup", [])
+    monkeypatch.setattr(mcp_api.app.router, "on_shutdown", [])
+    monkeypatch.setattr(mcp_api, "executions", {})
+    
+    # Leave every execution in progress unless a test finishes it
+    async def search_never_finishes(execution_id, parameters):
+        pass
+    
+    monkeypatch.setattr(mcp_api, "perform_search", search_never_finishes)
+    
+    with TestClient(mcp_api.app) as client:
+        yield client
+
+
+def start_search(client):
+    response = client.post("/tools/searxng_search/execute", json={"parameters": {"query": "cats"}})
+    assert response.status_code == 200
+    return response.json()["execution_id"]
+
+
+def test_long_poll_returns_as_soon_as_the_search_finishes(client, monkeypatch):
+    async def search_finishes_later(execution_id, parameters):
+        async def finish():
+            await asyncio.sleep(0.1)
+            execution = mcp_api.executions[execution_id]
+            execution.update({"status": "success", "result": {"results": ["cat"]}})
+            execution["event"].set()
+        
+        execution = mcp_api.executions[execution_id]
+        execution["task"] = asyncio.get_running_loop().create_task(finish())
+    
+    monkeypatch.setattr(mcp_api, "perform_search", search_finishes_later)
+    execution_id = start_search(client)
+    
+    started = time.monotonic()
+    response = client.get(STATUS_URL.format(execution_id), params={"wait": 10})
+    elapsed = time.monotonic() - started
+    
+    assert response.json()["status"] == "success"
+    assert response.json()["result"] == {"results": ["cat"]}
+    assert elapsed < 5
+
+
+def test_long_poll_gives_up_after_the_wait(client):
+    execution_id = start_search(client)
+    
+    started = time.monotonic()
+    response = client.get(STATUS_URL.format(execution_id), params={"wait": 0.2})
+    elapsed = time.monotonic() - started
+    
+    assert response.status_code == 200
+    assert response.json()["status"] == "in_progress"
+    assert elapsed >= 0.2
+
+
+def test_status_without_wait_returns_immediately(client):
+    execution_id = start_search(client)
+    
+    response = client.get(STATUS_URL.format(execution_id))
+    
+    assert response.json() == {
+        "status": "in_progress", "execution_id": execution_id, "result": None, "error": None
+    }
+
+
+def test_polling_an_evicted_execution_is_a_404(client, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(mcp_api, "executions", TTLCache(maxsize=10, ttl=60, timer=lambda: now[0]))
+    execution_id = start_search(client)
+    assert client.get(STATUS_URL.format(execution_id)).status_code == 200
+    
+    now[0] += 61
+    
+    response = client.get(STATUS_URL.format(execution_id), params={"wait": 1})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Execution not found"
+
+
+def test_search_for_an_evicted_execution_is_skipped(monkeypatch):
+    monkeypatch.setattr(mcp_api, "executions", TTLCache(maxsize=10, ttl=60))
+    
+    # The background task must neither raise KeyError nor recreate the entry
+    assert asyncio.run(mcp_api.perform_search("evicted", mcp_api.ToolParameters(query="cats"))) is None
+    assert "evicted" not in mcp_api.executions
@@ -0,0 +1,109 @@
+"""Tests for the Supabase helpers in utils, against an in-memory client."""
+
+import asyncio
+import itertools
+
+import pytest
+
+import utils
+
+
+class FakeRequest:
+    def __init__(self, execute):
+        self.execute = execute
+
+
+class FakeClient:
+    """Records inserts and returns them as rows with generated ids."""
+    
+    def __init__(self, return_rows=True):
+        self.return_rows = return_rows
+        self.inserted = []
+        self._ids = itertools.count(1)
+    
+    def _insert(self, data):
+        rows = [{**row, "id": next(self._ids)} for row in data]
+        self.inserted.extend(rows)
+        return type("Response", (), {"data": rows if self.return_rows else []})()
+    
+    def table(self, table_name):
+        return type("Table", (), {"insert": lambda _, data: FakeRequest(lambda: self._insert(data))})()
+
+
+def add(client, documents, metadatas=None, **kwargs):
+    return asyncio.run(utils.add_documents_to_supabase(client, "docs", documents, metadatas, **kwargs))
+
+
+def test_documents_are_not_deduplicated_by_default():
+    client = FakeClient()
+    
+    results = add(client, ["a", "a", "b"])
+    
+    assert [row["content"] for row in client.inserted] == ["a", "a", "b"]
+    assert [row["id"] for row in results] == [1, 2, 3]
+
+
+def test_metadata_is_not_serialized_when_rows_come_back_in_order(monkeypatch):
+    def fail(metadata):
+        raise AssertionError("metadata keys should not be needed")
+    
+    monkeypatch.setattr(utils, "_metadata_key", fail)
+    
+    results = add(FakeClient(), ["a", "b"], [{"source": "x"}, {"source": "y"}])
+    
+    assert [row["metadata"] for row in results] == [{"source": "x"}, {"source": "y"}]
+
+
+def test_deduplication_keeps_rows_with_different_metadata():
+    client = FakeClient()
+    
+    results = add(
+        client,
+        ["a", "a", "a", "b"],
+        [{"source": "x"}, {"source": "y"}, {"source": "x"}, {}],
+        deduplicate=True,
+        batch_size=2,
+    )
+    
+    assert [(row["content"], row["metadata"]) for row in client.inserted] == [
+        ("a", {"source": "x"}), ("a", {"source": "y"}), ("b", {})
+    ]
+    assert [row["id"] for row in results] == [1, 2, 1, 3]
+    assert [row["metadata"] for row in results] == [{"source": "x"}, {"source": "y"}, {"source": "x"}, {}]
+
+
+def test_results_are_matched_by_content_not_position():
+    client = FakeClient()
+    original_insert = client._insert
+    client._insert = lambda data: type("Response", (), {"data": list(reversed(original_insert(data).data))})()
+    
+    results = add(client, ["a", "b", "c"])
+    
+    assert [row["content"] for row in results] == ["a", "b", "c"]
+
+
+def test_missing_rows_in_the_response_become_none():
+    results = add(FakeClient(return_rows=False), ["a", "a", "b"], deduplicate=True)
+    
+    assert results == [None, None, None]
+
+
+def test_bulk_insert_function_may_return_nothing():
+    calls = []
+    
+    class RpcClient:
+        def rpc(self, name, params):
+            calls.append((name, params))
+            return FakeRequest(lambda: type("Response", (), {"data": None})())
+    
+    results = add(RpcClient(), ["a", "b"], bulk_insert_function="bulk_insert_docs")
+    
+    assert calls == [("bulk_insert_docs", {"contents": ["a", "b"], "metadatas": [{}, {}]})]
+    assert results == [None, None]
+
+
+def test_query_many_rejects_mismatched_embeddings():
+    with pytest.raises(ValueError, match="2 query embeddings for 3 queries"):
+        asyncio.run(utils.query_supabase_collection_many(
+            FakeClient(), "docs", ["a", "b", "c"], query_embeddings=[[1.0], [0.5]]
+        ))
@@ -1,16 +1,92 @@
 """Utility functions for text processing and Supabase operations."""
 
 import os
-import json
-from typing import List, Dict, Any, Optional
+import functools
+from itertools import islice, repeat
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple
 import asyncio
 
-from supabase import create_client, Client
+import httpx
+import orjson
+from supabase import create_client, Client, ClientOptions, PostgrestAPIError
+
+# Re-exported so existing imports from utils keep working
+from caching import CachedEmbedder, EmbeddingStore, QueryCache, query_cache
+
+# Connection pool shared by all Supabase sub-clients
+SUPABASE_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+SUPABASE_HTTP_TIMEOUT = 120.0
+
+# Maximum number of insert batches sent to Supabase at the same time
+INSERT_CONCURRENCY = 8
+
+# Maximum number of search RPCs sent to Supabase at the same time
+QUERY_CONCURRENCY = 8
+
+
+def chunked(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield successive lists of up to ``size`` items from an iterable.
+    
+    Args:
+        iterable: Items to split
+        size: Maximum number of items per chunk
+        
+    Returns:
+        Iterator over the chunks
+    """
+    iterator = iter(iterable)
+    return iter(lambda: list(islice(iterator, size)), [])
+
+
+def _metadata_key(metadata: Optional[Dict[str, Any]]) -> bytes:
+    """Serialize metadata into a canonical, hashable form."""
+    if isinstance(metadata, str):
+        metadata = orjson.loads(metadata)
+    return orjson.dumps(metadata or {}, option=orjson.OPT_SORT_KEYS, default=str)
+
+
+def _match_returned_rows(
+    sent: List[Dict[str, Any]],
+    returned: List[Dict[str, Any]],
+) -> List[Optional[Dict[str, Any]]]:
+    """Pair each sent row with the row the database returned for it.
+    
+    Inserts normally return one row per sent row, in order, which is checked
+    by content alone. Otherwise rows are matched by content and metadata,
+    falling back to content for metadata the database normalised differently.
+    
+    Args:
+        sent: Rows sent in one insert
+        returned: Rows returned by that insert
+        
+    Returns:
+        The matching returned row for each sent row, or None if there is none
+    """
+    if len(returned) == len(sent) and all(
+        row.get("content") == data["content"] for row, data in zip(returned, sent)
+    ):
+        return returned
+    
+    by_key: Dict[Tuple[str, bytes], List[Dict[str, Any]]] = {}
+    by_content: Dict[str, List[Dict[str, Any]]] = {}
+    for row in returned:
+        by_key.setdefault((row.get("content"), _metadata_key(row.get("metadata"))), []).append(row)
+        by_content.setdefault(row.get("content"), []).append(row)
+    
+    matches = []
+    for data in sent:
+        rows = by_key.get((data["content"], _metadata_key(data["metadata"]))) or by_content.get(data["content"])
+        matches.append(rows.pop(0) if rows else None)
+    return matches
 
 # Function to get Supabase client
+@functools.lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
     """Get a Supabase client using environment variables.
     
+    The client is created once and reused by later calls. All of its
+    sub-clients share one pooled HTTP/2 connection to the Supabase host.
+    
     Returns:
         A Supabase Client
     """
@@ -20,7 +96,13 @@ def get_supabase_client() -> Client:
     if not supabase_url or not supabase_key:
         raise ValueError("SUPABASE_URL and SUPABASE_KEY environment variables must be set")
     
-    return create_client(supabase_url, supabase_key)
+    http_client = httpx.Client(
+        http2=True,
+        limits=SUPABASE_HTTP_LIMITS,
+        timeout=SUPABASE_HTTP_TIMEOUT,
+    )
+    
+    return create_client(supabase_url, supabase_key, options=ClientOptions(httpx_client=http_client))
 
 
 async def add_documents_to_supabase(
@@ -29,58 +111,141 @@ async def add_documents_to_supabase(
     documents: List[str],
     metadatas: Optional[List[Dict[str, Any]]] = None,
     batch_size: int = 100,
-) -> List[Dict[str, Any]]:
+    max_concurrency: int = INSERT_CONCURRENCY,
+    embedder: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    deduplicate: bool = False,
+    bulk_insert_function: Optional[str] = None,
+) -> List[Optional[Dict[str, Any]]]:
     """Add documents to a Supabase table in batches.
     
+    Batches are inserted concurrently on worker threads, with at most
+    ``max_concurrency`` requests in flight at once. When an embedder is given,
+    each batch is embedded in one call before it is inserted; wrap it in
+    ``CachedEmbedder`` to skip documents that were embedded before.
+    
+    With ``deduplicate``, documents whose text and metadata are both identical
+    are inserted and embedded once, and every copy gets the row inserted for
+    the first one. Copies with different metadata keep their own rows.
+    
+    For large ingests, ``bulk_insert_function`` names a Postgres function that
+    receives each batch as arrays and inserts it with a single ``unnest``,
+    avoiding PostgREST's per-row JSON handling. For example::
+    
+        create function bulk_insert_docs(contents text[], metadatas jsonb[])
+        returns setof knowledge_base language sql as $$
+          insert into knowledge_base (content, metadata)
+          select c, m from unnest(contents, metadatas) as t(c, m)
+          returning *;
+        $$;
+    
+    When an embedder is also given, the function receives an extra
+    ``embeddings`` array. The function should return the inserted rows
+    (``returns setof``) so they can be matched to the documents; a function
+    that returns ``void`` or a scalar is accepted, but every result is then None.
+    
     Args:
         client: Supabase client
         table_name: Name of the table
         documents: List of document texts
         metadatas: Optional list of metadata dictionaries for each document
         batch_size: Size of batches for adding documents
+        max_concurrency: Maximum number of batches inserted at the same time
+        embedder: Optional function that embeds a list of texts in one call
+        deduplicate: Whether to insert documents with identical text and metadata only once
+        bulk_insert_function: Optional name of a Postgres function for array inserts
         
     Returns:
-        List of insertion results
+        List of inserted rows in input order, one per input document. Each
+        returned row is matched back to the document it was inserted for,
+        positionally when the insert returns every row in order and by content
+        and metadata otherwise. A document whose row was not returned gets None.
     """
     # Create default metadata if none provided
     if metadatas is None:
-        metadatas = [{}] * len(documents)
+        metadatas = repeat({}, len(documents))
     
-    # Initialize results
-    results = []
+    entries = list(zip(documents, metadatas))
     
-    # Process documents in batches
-    for i in range(0, len(documents), batch_size):
-        batch_documents = documents[i:i+batch_size]
-        batch_metadatas = metadatas[i:i+batch_size]
-        
-        # Prepare data for insertion
-        data = []
-        for j, (doc, meta) in enumerate(zip(batch_documents, batch_metadatas)):
-            # Convert metadata to JSON string if needed
-            meta_json = json.dumps(meta) if isinstance(meta, dict) else meta
+    # Keep the first of each identical (content, metadata) pair, remembering which
+    # unique entry every input document maps to
+    positions = None
+    if deduplicate:
+        unique: Dict[Tuple[str, bytes], int] = {}
+        positions = []
+        unique_entries = []
+        for doc, meta in entries:
+            position = unique.setdefault((doc, _metadata_key(meta)), len(unique_entries))
+            if position == len(unique_entries):
+                unique_entries.append((doc, meta))
+            positions.append(position)
+        entries = unique_entries
+    
+    # Prepare data for insertion
+    batches = []
+    for batch_entries in chunked(entries, batch_size):
+        # Metadata dicts are sent as-is; PostgREST encodes them into the jsonb column.
+        # Without an embedder, the embedding is filled by a Supabase Edge Function or trigger.
+        batches.append([
+            {"content": doc, "metadata": meta, "embedding": None}
+            for doc, meta in batch_entries
+        ])
+    
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def insert_batch(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        async with semaphore:
+            if embedder is not None:
+                vectors = await asyncio.to_thread(embedder, [row["content"] for row in data])
+                for row, vector in zip(data, vectors):
+                    row["embedding"] = vector
             
-            data.append({
-                "content": doc,
-                "metadata": meta_json,
-                "embedding": None  # Will be filled by Supabase Edge Function or trigger
-            })
+            if bulk_insert_function is None:
+                request = client.table(table_name).insert(data)
+            else:
+                params = {
+                    "contents": [row["content"] for row in data],
+                    "metadatas": [row["metadata"] for row in data],
+                }
+                if embedder is not None:
+                    params["embeddings"] = [row["embedding"] for row in data]
+                request = client.rpc(bulk_insert_function, params)
+            
+            response = await asyncio.to_thread(request.execute)
         
-        # Insert the batch
-        response = client.table(table_name).insert(data).execute()
-        results.extend(response.data)
+        # A void or scalar RPC inserts the rows without returning them
+        return response.data if isinstance(response.data, list) else []
+    
+    # Insert all batches concurrently; gather keeps the input order
+    responses = await asyncio.gather(*(insert_batch(data) for data in batches))
+    
+    # Pair every inserted row with its returned row, batch by batch
+    results = []
+    for data, batch_results in zip(batches, responses):
+        results.extend(_match_returned_rows(data, batch_results))
+    
+    # Give duplicates the row of their first occurrence
+    if positions is not None:
+        results = [results[position] for position in positions]
+    
+    # Cached searches on this table may now be missing the new documents
+    query_cache.invalidate(table_name)
     
     return results
 
 
-async def query_supabase_collection(
+def _search_documents(
     client: Client,
     table_name: str,
     query_text: str,
-    n_results: int = 5,
-    filters: Optional[Dict[str, Any]] = None,
+    n_results: int,
+    filters: Optional[Dict[str, Any]],
 ) -> Dict[str, Any]:
-    """Query a Supabase table for similar documents using vector similarity.
+    """Run the blocking vector search RPC and convert its rows.
+    
+    Filters are sent as a jsonb object so the RPC can push them into its
+    ``WHERE`` clause ahead of the nearest-neighbour ordering, e.g.
+    ``where metadata @> filters order by embedding <=> query limit match_count``.
+    A GIN index on ``metadata`` keeps the containment check cheap.
     
     Args:
         client: Supabase client
@@ -97,30 +262,149 @@ async def query_supabase_collection(
     
     # Build RPC call to Supabase function that performs vector search
     # This is a simplified example; actual implementation would depend on your Supabase setup
-    response = client.rpc(
-        'search_documents',
-        {
-            'query_text': query_text,
-            'match_count': n_results,
-            'table_name': table_name,
-            'filters': json.dumps(filters) if filters else '{}'
-        }
-    ).execute()
-    
-    if response.error:
-        raise Exception(f"Error querying Supabase: {response.error.message}")
+    # The client raises on error responses instead of setting an error field
+    try:
+        response = client.rpc(
+            'search_documents',
+            {
+                'query_text': query_text,
+                'match_count': n_results,
+                'table_name': table_name,
+                'filters': filters or {}
+            }
+        ).execute()
+    except PostgrestAPIError as e:
+        raise RuntimeError(f"Error querying Supabase: {e.message}") from e
+    
+    # Split the rows into columns in a single pass
+    documents, metadatas, distances, ids = [], [], [], []
+    for item in response.data:
+        documents.append(item['content'])
+        
+        # jsonb metadata already arrives decoded; only text columns need parsing
+        metadata = item['metadata']
+        if isinstance(metadata, str):
+            metadata = orjson.loads(metadata)
+        metadatas.append(metadata)
+        
+        distances.append(1 - item['similarity'])
+        ids.append(str(item['id']))
     
     # Process results into a format similar to ChromaDB for compatibility
-    results = {
-        "documents": [[item['content'] for item in response.data]],
-        "metadatas": [[json.loads(item['metadata']) for item in response.data]],
-        "distances": [[1 - item['similarity'] for item in response.data]],
-        "ids": [[str(item['id']) for item in response.data]]
+    return {
+        "documents": [documents],
+        "metadatas": [metadatas],
+        "distances": [distances],
+        "ids": [ids]
     }
+
+
+async def query_supabase_collection(
+    client: Client,
+    table_name: str,
+    query_text: str,
+    n_results: int = 5,
+    filters: Optional[Dict[str, Any]] = None,
+    query_embedding: Optional[Sequence[float]] = None,
+    use_cache: bool = False,
+) -> Dict[str, Any]:
+    """Query a Supabase table for similar documents using vector similarity.
+    
+    With ``use_cache``, results are cached in ``query_cache`` for its TTL.
+    Repeated queries, and queries whose embedding is close enough to a cached
+    one, then skip the RPC.
+    
+    Args:
+        client: Supabase client
+        table_name: Name of the table
+        query_text: Text to search for
+        n_results: Number of results to return
+        filters: Optional filters to apply to the query
+        query_embedding: Optional embedding of query_text for semantic cache hits
+        use_cache: Whether to read from and write to the query cache
+        
+    Returns:
+        Query results containing documents, metadatas, and similarity scores
+    """
+    if use_cache:
+        cached = query_cache.get(table_name, query_text, n_results, filters, query_embedding)
+        if cached is not None:
+            return cached
+    
+    # Run the blocking RPC on a worker thread so other coroutines keep running
+    results = await asyncio.to_thread(
+        _search_documents, client, table_name, query_text, n_results, filters
+    )
+    
+    if use_cache:
+        query_cache.put(table_name, query_text, n_results, filters, results, query_embedding)
     
     return results
 
 
+async def query_supabase_collection_many(
+    client: Client,
+    table_name: str,
+    queries: List[str],
+    n_results: int = 5,
+    filters: Optional[Dict[str, Any]] = None,
+    query_embeddings: Optional[List[Sequence[float]]] = None,
+    use_cache: bool = False,
+    max_concurrency: int = QUERY_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """Query a Supabase table for several query texts at once.
+    
+    Cache misses are searched concurrently on worker threads, with at most
+    ``max_concurrency`` RPCs in flight, so the batch costs roughly one round
+    trip instead of one per query.
+    
+    Args:
+        client: Supabase client
+        table_name: Name of the table
+        queries: Texts to search for
+        n_results: Number of results to return per query
+        filters: Optional filters to apply to every query
+        query_embeddings: Optional embeddings of the queries, in the same order
+        use_cache: Whether to read from and write to the query cache
+        max_concurrency: Maximum number of RPCs running at the same time
+        
+    Returns:
+        One query result per input text, in input order
+        
+    Raises:
+        ValueError: If query_embeddings and queries differ in length
+    """
+    if query_embeddings is None:
+        query_embeddings = [None] * len(queries)
+    elif len(query_embeddings) != len(queries):
+        raise ValueError(
+            f"Got {len(query_embeddings)} query embeddings for {len(queries)} queries"
+        )
+    
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def search(query_text: str, query_embedding: Optional[Sequence[float]]) -> Dict[str, Any]:
+        if use_cache:
+            cached = query_cache.get(table_name, query_text, n_results, filters, query_embedding)
+            if cached is not None:
+                return cached
+        
+        async with semaphore:
+            results = await asyncio.to_thread(
+                _search_documents, client, table_name, query_text, n_results, filters
+            )
+        
+        if use_cache:
+            query_cache.put(table_name, query_text, n_results, filters, results, query_embedding)
+        
+        return results
+    
+    return await asyncio.gather(*(
+        search(query_text, query_embedding)
+        for query_text, query_embedding in zip(queries, query_embeddings)
+    ))
+
+
 def format_results_as_context(query_results: Dict[str, Any]) -> str:
     """Format query results as a context string for the agent.
     
@@ -130,7 +414,7 @@ def format_results_as_context(query_results: Dict[str, Any]) -> str:
     Returns:
         Formatted context string
     """
-    context = "CONTEXT INFORMATION:\n\n"
+    parts = ["CONTEXT INFORMATION:\n\n"]
     
     for i, (doc, metadata, distance) in enumerate(zip(
         query_results["documents"][0],
@@ -138,14 +422,13 @@ def format_results_as_context(query_results: Dict[str, Any]) -> str:
         query_results["distances"][0]
     )):
         # Add document information
-        context += f"Document {i+1} (Relevance: {1 - distance:.2f}):\n"
+        parts.append(f"Document {i+1} (Relevance: {1.0 - distance:.2f}):\n")
         
         # Add metadata if available
         if metadata:
-            for key, value in metadata.items():
-                context += f"{key}: {value}\n"
+            parts.append("".join(f"{key}: {value}\n" for key, value in metadata.items()))
         
         # Add document content
-        context += f"Content: {doc}\n\n"
+        parts.append(f"Content: {doc}\n\n")
     
-    return context
+    return "".join(parts)